@@ -1,19 +1,30 @@
+import time
+_import_started = time.perf_counter()
 import os
 import pandas as pd
 import numpy as np
 import pickle
 import joblib
-import tensorflow as tf
-from flask import Flask, request, jsonify, session, send_from_directory,render_template
+from flask import Flask, request, jsonify, session, send_from_directory,render_template, Response, stream_with_context
 from flask_cors import CORS
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-import requests
 from datetime import datetime, timedelta, timezone
-from database import get_db_connection
-import time
-import json
-from io import StringIO
+from database import db_cursor, get_pool
+from ttl_cache import TTLCache
+from live_store import LiveStore
+from live_bridge import LiveBridge
+from live_refresher import LiveRefresher, RefreshPool
+from open_meteo import OpenMeteoClient
+from aqi import categorize_aqi
+from eda_index import EdaIndex
+from forecast_cache import ForecastCache, model_version
+from batch_predict import BatchValidationError, DEFAULT_CHUNK_SIZE, parse_batch, score_batch, batch_results, iter_ndjson_results
+from personalization import PERSONAL_FEATURE_NAMES, profile_features, has_personal_profile, user_features, score_horizon
+from inference_server import MicroBatcher, keras_forward
+from model_registry import ModelRegistry, memory_usage
+from static_snapshot import load_static_frame
+from locations import DEFAULT_LOCATION, InvalidLocationError, UnknownLocationError, load_locations, resolve_location, resolve_locations
 
 pd.set_option('future.no_silent_downcasting', True)
 
@@ -48,13 +59,21 @@ def profile_page():
     """Renders the user profile page."""
     return render_template('profile.html')
 
-LATITUDE = 27.7172
-LONGITUDE = 85.3240
 N_PAST = 72
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-CACHE_DIR = os.path.join(BASE_DIR, 'data', 'cache')
-CACHE_FILE = os.path.join(CACHE_DIR, 'live_df_cache.json')
+CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(BASE_DIR, 'data', 'cache'))
+LOCATIONS_DIR = os.path.join(CACHE_DIR, 'locations')
 CACHE_TIMEOUT = 3600
+BACKFILL_INTERVAL = 6 * 3600
+LIVE_REFRESH_INTERVAL = int(os.environ.get('LIVE_REFRESH_INTERVAL', CACHE_TIMEOUT * 3 // 4))
+LIVE_REFRESH_WORKERS = int(os.environ.get('LIVE_REFRESH_WORKERS', 4))
+LOCATIONS_FILE = os.environ.get('LOCATIONS_FILE')
+LOCATION_SEED_DAYS = int(os.environ.get('LOCATION_SEED_DAYS', 30))
+INFERENCE_MAX_BATCH_SIZE = int(os.environ.get('INFERENCE_MAX_BATCH_SIZE', 64))
+INFERENCE_MAX_WAIT_MS = float(os.environ.get('INFERENCE_MAX_WAIT_MS', 5))
+PRELOAD_MODELS = os.environ.get('PRELOAD_MODELS', '')
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 60))
 os.makedirs(CACHE_DIR, exist_ok=True)
 
 REGRESSION_MODEL_PATH = os.path.join(BASE_DIR, 'models', 'model.pkl')
@@ -62,130 +81,184 @@ PERSONAL_RISK_MODEL_PATH = os.path.join(BASE_DIR, 'models', 'personal_risk_model
 LSTM_MODEL_PATH = os.path.join(BASE_DIR, 'models', 'lstm_model.keras')
 SCALER_PATH = os.path.join(BASE_DIR, 'models', 'scaler.pkl')
 SOIL_IMPUTER_PATH = os.path.join(BASE_DIR, 'models', 'soil_imputer.pkl')
-DATA_PATH = os.path.join(BASE_DIR, 'data', 'processed', 'processed_data.csv')
-
-regression_model, personal_risk_model, soil_imputer_model, lstm_model, scaler = None, None, None, None, None
-REGRESSION_FEATURE_NAMES, SCALER_FEATURE_NAMES = [], []
-df_static = pd.DataFrame()
-try:
-    with open(REGRESSION_MODEL_PATH, "rb") as f: regression_model = pickle.load(f)
-    print("Main AQI regression model loaded successfully.")
-except Exception as e: print(f"CRITICAL ERROR: Could not load main AQI regression model: {e}")
-try:
-    with open(PERSONAL_RISK_MODEL_PATH, "rb") as f: personal_risk_model = pickle.load(f)
-    print("Personal risk model loaded successfully.")
-except Exception as e: print(f"CRITICAL WARNING: Could not load personal risk model: {e}")
-try:
-    soil_imputer_model = joblib.load(SOIL_IMPUTER_PATH)
-    print("Soil imputation model loaded successfully.")
-except Exception as e: print(f"CRITICAL WARNING: Could not load soil imputer model: {e}")
-try:
-    lstm_model = tf.keras.models.load_model(LSTM_MODEL_PATH)
-    scaler = joblib.load(SCALER_PATH)
-    SCALER_FEATURE_NAMES = scaler.get_feature_names_out()
-    print("LSTM Model and Scaler loaded successfully.")
-    if scaler:
-        REGRESSION_FEATURE_NAMES = [name for name in SCALER_FEATURE_NAMES if 'aqi' not in name.lower()]
-        print("Successfully derived regression feature names from the scaler.")
-except Exception as e: print(f"CRITICAL ERROR: Could not load LSTM model or scaler: {e}")
-try:
-    df_static = pd.read_csv(DATA_PATH, parse_dates=['Datetime'], index_col='Datetime')
-    df_static = df_static.asfreq('h')
-    if df_static.index.tz is None: df_static.index = df_static.index.tz_localize('UTC')
-    print(f"Successfully loaded and localized static data for EDA from {DATA_PATH}")
-except Exception as e: print(f"WARNING: Could not load static data for EDA dashboard: {e}")
-
-def get_cached_or_create_live_dataframe():
-    now = time.time()
-    if os.path.exists(CACHE_FILE):
-        with open(CACHE_FILE, 'r') as f:
-            try:
-                cache_data = json.load(f)
-                if now - cache_data.get('timestamp', 0) < CACHE_TIMEOUT:
-                    print("Returning cached dataframe from file.")
-                    df = pd.read_json(StringIO(cache_data['data']), orient='split')
-                    df.index = pd.to_datetime(df.index, unit='ms', utc=True)
-                    return df
-            except (json.JSONDecodeError, KeyError) as e: print(f"Cache file corrupted, fetching new data. Error: {e}")
-    print("Cache expired or not found. Fetching new live dataframe.")
-    df = create_live_dataframe(end_date=datetime.now(timezone.utc))
-    df_json_str = df.to_json(orient='split')
-    cache_content = {'timestamp': now, 'data': df_json_str}
-    with open(CACHE_FILE, 'w') as f: json.dump(cache_content, f)
-    return df
+
+def load_pickle(path):
+    with open(path, "rb") as f: return pickle.load(f)
+
+def load_lstm_model():
+    import tensorflow as tf  # only the forecast path needs TensorFlow
+    return tf.keras.models.load_model(LSTM_MODEL_PATH)
+
+models = ModelRegistry()
+models.register('regression', lambda: load_pickle(REGRESSION_MODEL_PATH), "Main AQI regression model")
+models.register('personal_risk', lambda: load_pickle(PERSONAL_RISK_MODEL_PATH), "Personal risk model")
+models.register('soil_imputer', lambda: joblib.load(SOIL_IMPUTER_PATH), "Soil imputation model")
+models.register('scaler', lambda: joblib.load(SCALER_PATH), "Scaler")
+models.register('lstm', load_lstm_model, "LSTM model")
+models.register('lstm_forward', lambda: keras_forward(models.require('lstm')), "Compiled LSTM forward pass")
+# Loads in the background at import. Under gunicorn --preload that happens in the master before the fork, and a worker
+# forked mid-load loads the artifact again itself; preload with background=False there to share the loaded models.
+if PRELOAD_MODELS: models.preload(None if PRELOAD_MODELS.lower() in ('1', 'true', 'all') else PRELOAD_MODELS.split(','))
+
+def scaler_feature_names():
+    scaler = models.get('scaler')
+    return list(scaler.get_feature_names_out()) if scaler is not None else []
+
+def regression_feature_names():
+    """Regression inputs: every scaler feature except AQI itself."""
+    return [name for name in scaler_feature_names() if 'aqi' not in name.lower()]
+
+lstm_batcher = MicroBatcher(lambda X: models.require('lstm_forward')(X), INFERENCE_MAX_BATCH_SIZE, INFERENCE_MAX_WAIT_MS / 1000, name='lstm')
+regression_batcher = MicroBatcher(lambda X: models.require('regression').predict(pd.DataFrame(X, columns=regression_feature_names(), copy=False)), INFERENCE_MAX_BATCH_SIZE, INFERENCE_MAX_WAIT_MS / 1000, name='regression')
+
+locations = load_locations(LOCATIONS_FILE)
+
+def remove_legacy_live_cache():
+    """Deletes the JSON live-frame cache that the per-location live stores replaced."""
+    try: os.remove(os.path.join(CACHE_DIR, 'live_df_cache.json'))
+    except FileNotFoundError: pass
+
+class LocationData:
+    """Live store, bridge, refresher and EDA index of one location, kept under LOCATIONS_DIR/<key>.
+
+    The stores are memory-mapped, so the history of every city costs page
+    cache shared by all workers rather than per-process heap.
+    """
+    def __init__(self, location):
+        self.location = location
+        self.root = os.path.join(LOCATIONS_DIR, location.key)
+        self.store = LiveStore(os.path.join(self.root, 'live_store'))
+        self.static_name = f"static_data/{location.key}"
+        if location.static_data:
+            models.register(self.static_name, lambda: load_static_frame(location.static_data, os.path.join(self.root, 'static')), f"Static data for {location.name}", default=pd.DataFrame())
+        self.bridge = LiveBridge(self.store, lambda start, end: fetch_open_meteo_hours(start, end, location), score_live_rows, API_TO_MODEL_MAP.values(), seed=self.seed_frame)
+        self.refresher = LiveRefresher(lambda: refresh_live_store(self), self.store, LIVE_REFRESH_INTERVAL, CACHE_TIMEOUT, os.path.join(self.root, 'live_store.lock'))
+        self.eda_index = EdaIndex()
+
+    def static_frame(self):
+        return models.get(self.static_name) if self.location.static_data else pd.DataFrame()
+
+    def seed_frame(self):
+        """History and filled-in flags for an empty store: the static CSV, or the last LOCATION_SEED_DAYS fetched from Open-Meteo."""
+        df_static = self.static_frame()
+        if len(df_static): return df_static, None
+        now = pd.Timestamp.now(tz='UTC').floor('h')
+        rows, filled = self.bridge.bridge(now - timedelta(days=LOCATION_SEED_DAYS), now)
+        return rows.drop(columns=['hour', 'month']), filled
+
+def refresh_live_store(data):
+    """Appends the hours missing from a location's live store and periodically backfills filled-in hours."""
+    store, name = data.store, data.location.name
+    now = datetime.now(timezone.utc)
+    appended = data.bridge.update(now)
+    store.mark_refreshed()
+    print(f"Live store for {name} refreshed: {appended} new rows, {len(store)} total.")
+    if time.time() - (store.backfilled_at or 0) >= BACKFILL_INTERVAL:
+        try: print(f"Live store backfill for {name} rewrote {data.bridge.backfill(now)} filled-in rows.")
+        except Exception as e: print(f"WARNING: Live store backfill for {name} failed: {e}")
+        store.mark_backfilled()
+
+class LiveDataWarmingUp(RuntimeError):
+    """Raised while a location's empty live store is being seeded from Open-Meteo."""
+
+def ensure_live_store(location=DEFAULT_LOCATION):
+    """Returns a location's live store without waiting on upstream fetches.
+
+    An empty store is seeded from the location's static CSV, a local read.
+    A location without one is seeded by its first refresh, which runs under
+    the store's locks like any other; until it lands LiveDataWarmingUp is
+    raised. An expired store is still served while the refresh pool renews
+    it in the background; with background refresh disabled
+    (LIVE_REFRESH_INTERVAL=0) the request refreshes it inline, unless
+    another worker is already doing so.
+    """
+    data = location_data[location]
+    if not len(data.store) and data.location.static_data: data.bridge.seed_if_empty()
+    if data.store.is_fresh(CACHE_TIMEOUT): return data.store
+    if LIVE_REFRESH_INTERVAL > 0:
+        refresh_pool.start(); refresh_pool.trigger(location)
+    else:
+        data.refresher.refresh_now(max_age=CACHE_TIMEOUT)
+    if not len(data.store): raise LiveDataWarmingUp(data.location)
+    return data.store
+
+def get_cached_or_create_live_dataframe(location=DEFAULT_LOCATION):
+    return ensure_live_store(location).frame()
+
+def request_location(payload=None):
+    """Key of the location named by ?location= or the JSON body, defaulting to DEFAULT_LOCATION."""
+    if payload is not None and not isinstance(payload, dict): raise InvalidLocationError("Expected a JSON object.")
+    return resolve_location(locations, request.args.get('location') or (payload or {}).get('location')).key
 
 class User(UserMixin):
     def __init__(self, id, username, password_hash, age=None, conditions=None):
         self.id, self.username, self.password, self.age, self.conditions = id, username, password_hash, age, conditions
 login_manager = LoginManager()
 login_manager.init_app(app)
+USER_COLUMNS = "id, username, password, age, conditions"
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+def user_from_row(user_data):
+    return User(user_data['id'], user_data['username'], user_data['password'], user_data['age'], user_data['conditions'])
 @login_manager.user_loader
 def load_user(user_id):
-    conn = get_db_connection()
-    if not conn: return None
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM users WHERE id = %s", (user_id,))
-    user_data = cursor.fetchone()
-    cursor.close(); conn.close()
-    if user_data: return User(user_data['id'], user_data['username'], user_data['password'], user_data['age'], user_data['conditions'])
-    return None
+    """Returns the session's user from the in-process cache, querying the database only on a miss."""
+    user = user_cache.get(str(user_id))
+    if user is not None: return user
+    try:
+        with db_cursor(dictionary=True) as cursor:
+            cursor.execute(f"SELECT {USER_COLUMNS} FROM users WHERE id = %s", (user_id,))
+            user_data = cursor.fetchone()
+    except Exception as e:
+        print(f"WARNING: Could not load user {user_id}: {e}")
+        return None
+    if not user_data: return None
+    user = user_from_row(user_data); user_cache.set(str(user.id), user)
+    return user
 
 def prepare_personal_model_input(ambient_aqi, user):
-    age = user.age if user.age else 30
-    conditions = user.conditions.lower() if user.conditions else ""
-    has_respiratory = 1 if any(c in conditions for c in ['asthma', 'copd', 'respiratory']) else 0
-    has_heart = 1 if any(c in conditions for c in ['heart', 'cardiovascular']) else 0
-    return pd.DataFrame({'ambient_aqi': [ambient_aqi], 'age': [age], 'has_respiratory_condition': [has_respiratory], 'has_heart_condition': [has_heart]})
+    """One-row personal model input. Prefer score_horizon, which scores a whole horizon in one call."""
+    return pd.DataFrame([(ambient_aqi,) + profile_features(user.age, user.conditions)], columns=PERSONAL_FEATURE_NAMES)
 def get_personal_advice(aqi, user):
-    if not user or not user.is_authenticated or not (user.age or user.conditions): return None
+    if not has_personal_profile(user): return None
     advice_parts = []
     category, _, _, _ = categorize_aqi(aqi)
     sensitive = ["Unhealthy for Sensitive Groups", "Unhealthy", "Very Unhealthy", "Hazardous"]
+    _, has_respiratory, has_heart = profile_features(user.age, user.conditions)
     if user.age and user.age > 60 and category in sensitive: advice_parts.append("Given your age, it is strongly recommended to stay indoors.")
-    if user.conditions:
-        conditions = user.conditions.lower()
-        if any(c in conditions for c in ['asthma', 'copd', 'respiratory']) and category in sensitive: advice_parts.append("Your respiratory condition puts you at high risk. Avoid all outdoor activity.")
-        if any(c in conditions for c in ['heart', 'cardiovascular']) and category in sensitive: advice_parts.append("Your heart condition makes you more vulnerable. Avoid strenuous activity.")
+    if has_respiratory and category in sensitive: advice_parts.append("Your respiratory condition puts you at high risk. Avoid all outdoor activity.")
+    if has_heart and category in sensitive: advice_parts.append("Your heart condition makes you more vulnerable. Avoid strenuous activity.")
     return " ".join(advice_parts) if advice_parts else "The current air quality should not pose a significant additional risk based on your profile."
-def categorize_aqi(aqi):
-    if aqi is None or np.isnan(aqi): return "Unknown", "#808080", "Data not available.", "❓"
-    aqi = int(aqi)
-    if aqi <= 50: return "Good", "#28a745", "Air quality is satisfactory.", "😊"
-    elif aqi <= 100: return "Moderate", "#ffc107", "Some pollutants may be a moderate health concern.", "😐"
-    elif aqi <= 150: return "Unhealthy for Sensitive Groups", "#fd7e14", "Members of sensitive groups may experience health effects.", "😷"
-    elif aqi <= 200: return "Unhealthy", "#dc3545", "Everyone may begin to experience health effects.", "🤢"
-    elif aqi <= 300: return "Very Unhealthy", "#8f3e97", "Health warnings of emergency conditions.", "😵"
-    else: return "Hazardous", "#7f0000", "Health alert: everyone should avoid all outdoor exertion.", "☠️"
-
-def create_live_dataframe(end_date):
-    if df_static.empty: raise ValueError("Static historical data is not loaded.")
-    last_static_date = df_static.index.max()
-    if end_date <= last_static_date: return df_static[df_static.index <= end_date]
-    gap_start_date = last_static_date + timedelta(hours=1)
-    weather_params="temperature_2m,relative_humidity_2m,precipitation,cloud_cover,surface_pressure,pressure_msl,wind_speed_10m,wind_direction_10m,wind_gusts_10m,uv_index"
-    weather_url = f"https://archive-api.open-meteo.com/v1/archive?latitude={LATITUDE}&longitude={LONGITUDE}&start_date={gap_start_date.strftime('%Y-%m-%d')}&end_date={end_date.strftime('%Y-%m-%d')}&hourly={weather_params}&timezone=UTC"
-    weather_response = requests.get(weather_url); weather_response.raise_for_status()
-    weather_data = weather_response.json()['hourly']
-    aq_params = "pm10,pm2_5,carbon_monoxide,nitrogen_dioxide,sulphur_dioxide,ozone"
-    aq_url = f"https://air-quality-api.open-meteo.com/v1/air-quality?latitude={LATITUDE}&longitude={LONGITUDE}&start_date={gap_start_date.strftime('%Y-%m-%d')}&end_date={end_date.strftime('%Y-%m-%d')}&hourly={aq_params}&timezone=UTC"
-    aq_response = requests.get(aq_url); aq_response.raise_for_status()
-    aq_data = aq_response.json()['hourly']
-    df_gap = pd.DataFrame(weather_data).merge(pd.DataFrame(aq_data), on='time').rename(columns={'time': 'Datetime'})
-    df_gap['Datetime'] = pd.to_datetime(df_gap['Datetime'], utc=True)
-    df_gap.set_index('Datetime', inplace=True)
-    df_gap.ffill(inplace=True); df_gap.bfill(inplace=True); df_gap.fillna(0, inplace=True)
-    api_to_model_map = {"pm10":"PM10 (μg/m³)","pm2_5":"PM2.5 (μg/m³)","carbon_monoxide":"CO (μg/m³)","nitrogen_dioxide":"NO2 (μg/m³)","sulphur_dioxide":"SO2 (μg/m³)","ozone":"O3 (μg/m³)","uv_index":"UV_Index","temperature_2m":"Temp (°C)","relative_humidity_2m":"Humidity (%)","wind_direction_10m":"Wind_Direction (°)","precipitation":"Precipitation (mm)","surface_pressure":"Surface_Pressure (hPa)","pressure_msl":"Pressure_MSL (hPa)","wind_speed_10m":"Wind_Speed (km/h)","wind_gusts_10m":"Wind_Gusts (km/h)","cloud_cover":"Cloud_Cover (%)"}
-    df_gap.rename(columns=api_to_model_map, inplace=True)
+WEATHER_PARAMS = "temperature_2m,relative_humidity_2m,precipitation,cloud_cover,surface_pressure,pressure_msl,wind_speed_10m,wind_direction_10m,wind_gusts_10m,uv_index"
+AIR_QUALITY_PARAMS = "pm10,pm2_5,carbon_monoxide,nitrogen_dioxide,sulphur_dioxide,ozone"
+API_TO_MODEL_MAP = {"pm10":"PM10 (μg/m³)","pm2_5":"PM2.5 (μg/m³)","carbon_monoxide":"CO (μg/m³)","nitrogen_dioxide":"NO2 (μg/m³)","sulphur_dioxide":"SO2 (μg/m³)","ozone":"O3 (μg/m³)","uv_index":"UV_Index","temperature_2m":"Temp (°C)","relative_humidity_2m":"Humidity (%)","wind_direction_10m":"Wind_Direction (°)","precipitation":"Precipitation (mm)","surface_pressure":"Surface_Pressure (hPa)","pressure_msl":"Pressure_MSL (hPa)","wind_speed_10m":"Wind_Speed (km/h)","wind_gusts_10m":"Wind_Gusts (km/h)","cloud_cover":"Cloud_Cover (%)"}
+SOIL_IMPUTER_FEATURES = ['Temp (°C)', 'UV_Index', 'Cloud_Cover (%)', 'hour', 'month']
+
+open_meteo = OpenMeteoClient(timeout=(5, float(os.environ.get('OPEN_METEO_TIMEOUT', 30))), retries=int(os.environ.get('OPEN_METEO_RETRIES', 3)), cache_dir=os.path.join(CACHE_DIR, 'open_meteo'))
+
+def fetch_open_meteo_hours(start, end, location=None):
+    """Fetches raw hourly weather and air-quality readings at a location for the days spanning [start, end], renamed to model columns."""
+    location = location or locations[DEFAULT_LOCATION]
+    df_raw = open_meteo.fetch_hourly(location.latitude, location.longitude, start, end, WEATHER_PARAMS.split(','), AIR_QUALITY_PARAMS.split(','))
+    return df_raw.rename(columns=API_TO_MODEL_MAP)
+
+def score_live_rows(df_raw):
+    """Imputes soil readings and predicts AQI for a frame of raw hourly readings."""
+    df_gap = df_raw.copy()
     df_gap['hour'] = df_gap.index.hour; df_gap['month'] = df_gap.index.month
-    imputer_features = ['Temp (°C)', 'UV_Index', 'Cloud_Cover (%)', 'hour', 'month']
-    predicted_soil = soil_imputer_model.predict(df_gap[imputer_features])
+    predicted_soil = models.require('soil_imputer').predict(df_gap[SOIL_IMPUTER_FEATURES])
     df_gap['Soil_Temp (°C)'] = predicted_soil[:, 0]; df_gap['Soil_Moisture (m³/m³)'] = predicted_soil[:, 1]
-    df_for_rf = df_gap[REGRESSION_FEATURE_NAMES]
-    predicted_aqi = regression_model.predict(df_for_rf)
+    df_for_rf = df_gap[regression_feature_names()]
+    predicted_aqi = models.require('regression').predict(df_for_rf)
     df_gap['AQI'] = np.clip(predicted_aqi, 0, None)
-    df_live = pd.concat([df_static, df_gap[df_static.columns]])
-    df_live = df_live[~df_live.index.duplicated(keep='last')]
-    return df_live
+    return df_gap
+
+remove_legacy_live_cache()
+location_data = {key: LocationData(location) for key, location in locations.items()}
+refresh_pool = RefreshPool({key: data.refresher for key, data in location_data.items()}, LIVE_REFRESH_WORKERS, on_round=lambda keys: warm_forecast_cache(keys))
+
+def create_live_dataframe(end_date, location=DEFAULT_LOCATION):
+    """A location's hourly history up to ``end_date``, read from its live store."""
+    return ensure_live_store(location).slice(end=end_date)
 
 @app.before_request
 def make_session_permanent(): session.permanent = True
@@ -193,30 +266,27 @@ def make_session_permanent(): session.permanent = True
 @app.route('/api/session_status')
 def session_status():
     if current_user.is_authenticated:
-        return jsonify({"logged_in": True, "user": {"username": current_user.username, "age": current_user.age, "conditions": current_user.conditions}, "features": REGRESSION_FEATURE_NAMES})
-    return jsonify({"logged_in": False, "features": REGRESSION_FEATURE_NAMES})
+        return jsonify({"logged_in": True, "user": {"username": current_user.username, "age": current_user.age, "conditions": current_user.conditions}, "features": regression_feature_names()})
+    return jsonify({"logged_in": False, "features": regression_feature_names()})
 
 @app.route('/api/login', methods=['POST'])
 def login():
     data = request.get_json(); username, password = data['username'], data['password']
-    conn = get_db_connection(); cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
-    user_data = cursor.fetchone(); cursor.close(); conn.close()
+    with db_cursor(dictionary=True) as cursor:
+        cursor.execute(f"SELECT {USER_COLUMNS} FROM users WHERE username = %s", (username,))
+        user_data = cursor.fetchone()
     if user_data and check_password_hash(user_data['password'], password):
-        user_obj = User(user_data['id'], user_data['username'], user_data['password'], user_data['age'], user_data['conditions'])
+        user_obj = user_from_row(user_data); user_cache.set(str(user_obj.id), user_obj)
         login_user(user_obj, remember=True)
         return jsonify({"success": True, "message": "Login successful!", "user": {"username": user_data['username'], "age": user_data['age'], "conditions": user_data['conditions']}})
     return jsonify({"success": False, "message": "Invalid username or password."}), 401
 @app.route('/api/register', methods=['POST'])
 def register():
     data = request.get_json(); username, password = data['username'], data['password']
-    conn = get_db_connection(); cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
-    if cursor.fetchone():
-        cursor.close(); conn.close()
-        return jsonify({"success": False, "message": "Username already exists."}), 409
-    cursor.execute("INSERT INTO users (username, password) VALUES (%s, %s)", (username, generate_password_hash(password)))
-    conn.commit(); cursor.close(); conn.close()
+    with db_cursor(commit=True) as cursor:
+        cursor.execute("SELECT id FROM users WHERE username = %s", (username,))
+        if cursor.fetchone(): return jsonify({"success": False, "message": "Username already exists."}), 409
+        cursor.execute("INSERT INTO users (username, password) VALUES (%s, %s)", (username, generate_password_hash(password)))
     return jsonify({"success": True, "message": "Registration successful! Please log in."})
 @app.route('/api/logout', methods=['POST'])
 @login_required
@@ -227,9 +297,9 @@ def logout():
 @login_required
 def profile():
     data = request.get_json(); age = data.get('age') or None; conditions = data.get('conditions', '').strip() or None
-    conn = get_db_connection(); cursor = conn.cursor()
-    cursor.execute("UPDATE users SET age = %s, conditions = %s WHERE id = %s", (age, conditions, current_user.id))
-    conn.commit(); cursor.close(); conn.close()
+    with db_cursor(commit=True) as cursor:
+        cursor.execute("UPDATE users SET age = %s, conditions = %s WHERE id = %s", (age, conditions, current_user.id))
+    user_cache.invalidate(str(current_user.id))
     current_user.age = int(age) if age else None; current_user.conditions = conditions
     return jsonify({"success": True, "message": "Profile updated successfully!", "user": {"age": age, "conditions": conditions}})
 
@@ -237,101 +307,191 @@ def profile():
 def predict():
     try:
         data = request.get_json()
-        input_df = pd.DataFrame([data], columns=REGRESSION_FEATURE_NAMES)
-        ambient_aqi = max(0, regression_model.predict(input_df)[0])
+        input_row = pd.DataFrame([data], columns=regression_feature_names()).to_numpy(dtype='float64')
+        ambient_aqi = max(0, float(regression_batcher.predict(input_row)[0]))
         cat, color, advice, emoji = categorize_aqi(ambient_aqi)
         perceived_aqi, personal_advice = None, None
         
-        if current_user.is_authenticated and (current_user.age or current_user.conditions):
-            personal_input_df = prepare_personal_model_input(ambient_aqi, current_user)
-            perceived_aqi_pred = personal_risk_model.predict(personal_input_df)[0]
-            perceived_aqi = max(ambient_aqi, perceived_aqi_pred)
+        if has_personal_profile(current_user):
+            perceived_aqi = float(score_horizon(models.require('personal_risk'), [ambient_aqi], user_features(current_user))[0])
             personal_advice = get_personal_advice(perceived_aqi, current_user)
             
         return jsonify({'predicted_aqi': round(ambient_aqi, 2), 'perceived_aqi': round(perceived_aqi, 2) if perceived_aqi is not None else None, 'category': cat, 'color': color, 'advice': advice, 'emoji': emoji, 'personal_advice': personal_advice})
     except Exception as e: return jsonify({"error": f"An error occurred: {e}"}), 400
 
+@app.route('/api/predict_batch', methods=['POST'])
+def predict_batch():
+    """Scores many feature rows at once (JSON array, CSV or NDJSON body or upload); ?stream=1 streams NDJSON."""
+    try:
+        features, ids = parse_batch(request, regression_feature_names())
+        if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+            chunk_size = max(1, int(request.args.get('chunk_size', DEFAULT_CHUNK_SIZE)))
+            return Response(stream_with_context(iter_ndjson_results(models.require('regression'), features, ids, chunk_size)), mimetype='application/x-ndjson')
+        aqi, codes = score_batch(models.require('regression'), features)
+        results = batch_results(aqi, codes, ids)
+        return jsonify({"count": len(results), "results": results})
+    except BatchValidationError as e: return jsonify({"error": str(e)}), e.status
+    except Exception as e: return jsonify({"error": f"An error occurred: {e}"}), 400
+
+forecast_cache = ForecastCache(maxsize=4 * len(locations))
+MODEL_VERSION = model_version(LSTM_MODEL_PATH, SCALER_PATH)
+
+def serialize_aqi_points(df):
+    """Chart points [{'ds', 'yhat'}] for the AQI column of an hourly frame."""
+    return [{'ds': ds, 'yhat': yhat} for ds, yhat in zip(df.index.strftime('%Y-%m-%dT%H:%M:%S'), df['AQI'].round(2).tolist())]
+
+def compute_ambient_forecasts(windows):
+    """Runs the LSTM on several N_PAST-hour windows in one batched call and pre-serializes the user-independent parts of each response."""
+    scaler, feature_names = models.require('scaler'), scaler_feature_names()
+    scaled_sequence = scaler.transform(pd.concat([df_for_lstm[feature_names] for df_for_lstm in windows]))
+    input_data = scaled_sequence.reshape(len(windows), N_PAST, len(feature_names))
+    scaled_prediction = lstm_batcher.predict(input_data).reshape(len(windows), -1)
+    dummy_array = np.zeros((scaled_prediction.size, len(feature_names))); dummy_array[:, 0] = scaled_prediction.ravel()
+    final_aqi_predictions = np.clip(scaler.inverse_transform(dummy_array)[:, 0], 0, None).reshape(scaled_prediction.shape)
+    entries = []
+    for df_for_lstm, final_aqi_prediction in zip(windows, final_aqi_predictions):
+        future_ts = pd.date_range(df_for_lstm.index[-1] + pd.Timedelta(hours=1), periods=len(final_aqi_prediction), freq='h')
+        ds = future_ts.strftime('%Y-%m-%dT%H:%M:%S').tolist()
+        entries.append({"values": final_aqi_prediction, "ds": ds,
+                        "forecast": [{'ds': d, 'yhat': yhat, 'perceived_yhat': None} for d, yhat in zip(ds, final_aqi_prediction.round(2).tolist())],
+                        "historical": serialize_aqi_points(df_for_lstm)})
+    return entries
+
+def compute_ambient_forecast(df_for_lstm):
+    return compute_ambient_forecasts([df_for_lstm])[0]
+
+def forecast_window(location):
+    """The latest N_PAST-hour live window of a location and its forecast cache key.
+
+    The key includes the store generation so hours rewritten in place by a
+    backfill invalidate the forecast even though the last hour is unchanged.
+    """
+    store = ensure_live_store(location)
+    generation = store.generation  # read first: a rewrite after it only costs a recomputation
+    df_for_lstm = store.tail(N_PAST)
+    return df_for_lstm, (location, df_for_lstm.index[-1] if len(df_for_lstm) else None, generation, MODEL_VERSION)
+
+def get_ambient_forecast(location=DEFAULT_LOCATION):
+    """Returns the cached ambient forecast for a location's latest live window, computing it once per new hour or backfill."""
+    df_for_lstm, cache_key = forecast_window(location)
+    if len(df_for_lstm) < N_PAST: return None
+    return forecast_cache.get_or_compute(cache_key, lambda: compute_ambient_forecast(df_for_lstm))
+
+def get_ambient_forecasts(keys):
+    """Cached ambient forecasts for several locations (None where history is short or still loading); cache misses are scored in one batched call."""
+    windows = {}
+    for key in keys:
+        try: windows[key] = forecast_window(key)
+        except LiveDataWarmingUp: pass
+    windows = {key: w for key, w in windows.items() if len(w[0]) == N_PAST}
+    forecasts = {key: forecast_cache.get(cache_key) for key, (_, cache_key) in windows.items()}
+    missing = [key for key, entry in forecasts.items() if entry is None]
+    if missing:
+        for key, entry in zip(missing, compute_ambient_forecasts([windows[key][0] for key in missing])):
+            forecasts[key] = forecast_cache.put(windows[key][1], entry)
+    return {key: forecasts.get(key) for key in keys}
+
+def warm_forecast_cache(keys):
+    """Scores the new forecasts of every location refreshed in one refresh-pool round in a single batched call."""
+    try: get_ambient_forecasts(keys)
+    except Exception as e: print(f"WARNING: Could not warm the forecast cache for {', '.join(keys)}: {e}")
+
+def forecast_response(ambient, hours):
+    """The /api/forecast_lstm body for one location, with perceived values for logged-in users with a profile."""
+    forecast_data = ambient['forecast'][:hours]
+    if has_personal_profile(current_user):
+        perceived = score_horizon(models.require('personal_risk'), ambient['values'][:hours], user_features(current_user))
+        forecast_data = [dict(point, perceived_yhat=perceived_yhat) for point, perceived_yhat in zip(forecast_data, perceived.round(2).tolist())]
+    return {"historical": ambient['historical'], "forecast": forecast_data}
+
+def warming_up_body(location):
+    return {"error": f"Live data for {location.name} is still loading; try again shortly.", "warming_up": True}
+
+@app.errorhandler(UnknownLocationError)
+def unknown_location(e):
+    return jsonify({"error": f"Unknown location '{e.args[0]}'.", "locations": sorted(locations)}), 404
+
+@app.errorhandler(InvalidLocationError)
+def invalid_location(e):
+    return jsonify({"error": str(e)}), 400
+
+@app.errorhandler(LiveDataWarmingUp)
+def live_data_warming_up(e):
+    return jsonify(warming_up_body(e.args[0])), 503, {"Retry-After": "5"}
+
+@app.route('/api/locations')
+def list_locations():
+    return jsonify({"default": DEFAULT_LOCATION, "locations": [location.public() for location in locations.values()]})
+
 @app.route('/api/forecast_lstm', methods=['POST'])
 def forecast_lstm_live():
+    """Forecast for ?location= or body 'location'; a body 'locations' list returns every listed city from one batched run."""
+    data = request.get_json(silent=True) or {}
+    location = request_location(data)
+    keys = [entry.key for entry in resolve_locations(locations, data['locations'])] if 'locations' in data else None
     try:
-        hours = int(request.get_json().get('hours', 24))
-        df_live_hist = get_cached_or_create_live_dataframe()
-        df_for_lstm = df_live_hist[SCALER_FEATURE_NAMES].tail(N_PAST)
-        if len(df_for_lstm) < N_PAST: return jsonify({"error": "Not enough historical data."}), 500
-        scaled_sequence = scaler.transform(df_for_lstm)
-        input_data = scaled_sequence.reshape(1, N_PAST, len(SCALER_FEATURE_NAMES))
-        scaled_prediction = lstm_model.predict(input_data)[0]
-        dummy_array = np.zeros((len(scaled_prediction), len(SCALER_FEATURE_NAMES))); dummy_array[:, 0] = scaled_prediction.flatten()
-        final_aqi_prediction = np.clip(scaler.inverse_transform(dummy_array)[:, 0], 0, None)
-        last_ts = df_for_lstm.index[-1]
-        future_ts = [last_ts + pd.Timedelta(hours=i) for i in range(1, len(final_aqi_prediction) + 1)]
-        forecast_data = []
-        for ts, ambient_val in zip(future_ts, final_aqi_prediction):
-            perceived_val = None
-            if current_user.is_authenticated and (current_user.age or current_user.conditions):
-                personal_input_df = prepare_personal_model_input(ambient_val, current_user)
-                perceived_pred = personal_risk_model.predict(personal_input_df)[0]
-                perceived_val = max(ambient_val, perceived_pred)
-            forecast_data.append({'ds': ts.strftime('%Y-%m-%dT%H:%M:%S'), 'yhat': round(float(ambient_val), 2), 'perceived_yhat': round(float(perceived_val), 2) if perceived_val is not None else None})
-        historical_data_for_chart = [{'ds': idx.strftime('%Y-%m-%dT%H:%M:%S'), 'yhat': round(row['AQI'], 2)} for idx, row in df_for_lstm.iterrows()]
-        return jsonify({"historical": historical_data_for_chart, "forecast": forecast_data[:hours]})
+        hours = int(data.get('hours', 24))
+        if keys is not None:
+            forecasts = get_ambient_forecasts(keys)
+            missing = lambda key: {"error": "Not enough historical data."} if len(location_data[key].store) else warming_up_body(locations[key])
+            return jsonify({"locations": {key: forecast_response(forecasts[key], hours) if forecasts[key] else missing(key) for key in keys}})
+        ambient = get_ambient_forecast(location)
+        if ambient is None: return jsonify({"error": "Not enough historical data."}), 500
+        return jsonify(forecast_response(ambient, hours))
+    except LiveDataWarmingUp: raise
     except Exception as e: return jsonify({"error": f"An error occurred during forecasting: {e}"}), 500
 
 @app.route('/api/historical_data')
 def get_historical_data_live():
+    location = request_location()
     try:
-        df_live = get_cached_or_create_live_dataframe()
         now = datetime.now(timezone.utc)
-        df_chart_data = df_live[df_live.index >= now - timedelta(days=7)]
-        return jsonify([{'ds': idx.strftime('%Y-%m-%dT%H:%M:%S'), 'yhat': round(row['AQI'], 2)} for idx, row in df_chart_data.iterrows()])
+        df_chart_data = ensure_live_store(location).slice(start=now - timedelta(days=7))
+        return jsonify(serialize_aqi_points(df_chart_data))
+    except LiveDataWarmingUp: raise
     except Exception as e: return jsonify([]), 500
 @app.route('/api/fetch_current_data')
 def fetch_current_data():
+    location = request_location()
     try:
-        df_live = get_cached_or_create_live_dataframe()
-        latest_data = df_live.iloc[-1].to_dict()
+        latest_data = ensure_live_store(location).tail(1).iloc[-1].to_dict()
         for key, value in latest_data.items():
             if isinstance(value, np.generic): latest_data[key] = value.item()
-        return jsonify({"source": "Live API (Bridged)", "data": latest_data})
+        return jsonify({"source": "Live API (Bridged)", "location": location, "data": latest_data})
+    except LiveDataWarmingUp: raise
     except Exception as e: return jsonify({"error": f"An error occurred: {e}"}), 500
+@app.route('/api/status')
+def status():
+    return jsonify({"live": {key: data.refresher.status(background=refresh_pool.running and key in refresh_pool.refreshers) for key, data in location_data.items()}, "refresh_pool": refresh_pool.status(),
+                    "forecast": dict(forecast_cache.status(), model_version=MODEL_VERSION),
+                    "inference": {"lstm": lstm_batcher.status(), "regression": regression_batcher.status()},
+                    "process": dict(memory_usage(), pid=os.getpid(), startup_seconds=round(STARTUP_SECONDS, 3)), "models": models.status(),
+                    "db": get_pool().status(), "user_cache": user_cache.status()})
+
 @app.route('/api/eda_data')
 def get_eda_data():
-    if df_static.empty: return jsonify({"error": "Static data for analysis is not loaded."}), 500
+    data = location_data[request_location()]
+    eda_index = data.eda_index
+    if not len(eda_index) and len(data.static_frame()): eda_index.rebuild(data.static_frame())
+    try: eda_index.sync(ensure_live_store(data.location.key))
+    except LiveDataWarmingUp:
+        if not len(eda_index): raise
+    except Exception as e: print(f"WARNING: Could not extend EDA index with live rows: {e}")
+    if not len(eda_index): return jsonify({"error": f"Data for analysis is not loaded for {data.location.name}."}), 500
     try:
         start_str, end_str = request.args.get('start'), request.args.get('end')
-        end = pd.to_datetime(end_str, utc=True) if end_str else df_static.index.max()
-        start = pd.to_datetime(start_str, utc=True) if start_str else end - pd.DateOffset(years=1)
-        df_filtered = df_static.loc[start:end].copy()
-        if df_filtered.empty: return jsonify({"error": "No data available for the selected date range."}), 404
-        daily_avg = df_filtered['AQI'].resample('D').mean()
-        hist, bins = np.histogram(df_filtered['AQI'].dropna(), bins=20)
-        cat_counts = df_filtered['AQI'].apply(lambda x: categorize_aqi(x)[0]).value_counts()
-        stats = df_filtered['AQI'].agg(['mean', 'median', 'max', 'min']).round(2)
-        df_table = df_filtered[['AQI', 'Temp (°C)', 'Humidity (%)', 'Wind_Speed (km/h)']].round(1).tail(500)
-        df_table.index.name = 'Datetime'
-        df_table.reset_index(inplace=True)
-        table_data = {"columns": df_table.columns.tolist(), "data": df_table.to_dict(orient='records')}
-        by_month = df_filtered.groupby(df_filtered.index.month_name())['AQI'].mean().reindex(['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']).dropna()
-        by_day = df_filtered.groupby(df_filtered.index.day_name())['AQI'].mean().reindex(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']).dropna()
-        by_hour = df_filtered.groupby(df_filtered.index.hour)['AQI'].mean()
-        return jsonify({
-            "table_data": table_data,
-            "time_series": {
-                "aqi_over_time": {"labels": daily_avg.index.strftime('%Y-%m-%d').tolist(), "values": daily_avg.dropna().round(2).tolist()},
-                "dist": {"labels": [f"{int(b)}-{int(bins[i+1])}" for i, b in enumerate(bins[:-1])], "values": hist.tolist()},
-                "categories": {"labels": cat_counts.index.tolist(), "values": cat_counts.values.tolist()},
-                "stats": stats.to_dict()
-            },
-            "deep_dive": {
-                "by_month": {"labels": by_month.index.tolist(), "values": by_month.round(2).tolist()},
-                "by_day_of_week": {"labels": by_day.index.tolist(), "values": by_day.round(2).tolist()},
-                "by_hour": {"labels": by_hour.index.map(lambda h: f"{h:02d}:00").tolist(), "values": by_hour.round(2).tolist()}
-            }
-        })
+        end = pd.to_datetime(end_str, utc=True) if end_str else None
+        start = pd.to_datetime(start_str, utc=True) if start_str else None
+        summary = eda_index.summary(start, end)
+        if summary is None: return jsonify({"error": "No data available for the selected date range."}), 404
+        return jsonify(summary)
     except Exception as e:
         print(f"Error in get_eda_data: {e}")
         return jsonify({"error": f"An error occurred during data analysis: {str(e)}"}), 500
 
+STARTUP_SECONDS = time.perf_counter() - _import_started
+print(f"App ready in {STARTUP_SECONDS:.2f}s (pid {os.getpid()}, RSS {memory_usage()['rss_mb']} MB); models load on first use.")
+
 if __name__ == '__main__':
     app.run(debug=True, port=5001)
 
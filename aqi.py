@@ -0,0 +1,30 @@
+import numpy as np
+
+# Upper bound (inclusive, on the truncated AQI) of every category but the last.
+AQI_BREAKPOINTS = np.array([50, 100, 150, 200, 300])
+AQI_CATEGORIES = (
+    ("Good", "#28a745", "Air quality is satisfactory.", "😊"),
+    ("Moderate", "#ffc107", "Some pollutants may be a moderate health concern.", "😐"),
+    ("Unhealthy for Sensitive Groups", "#fd7e14", "Members of sensitive groups may experience health effects.", "😷"),
+    ("Unhealthy", "#dc3545", "Everyone may begin to experience health effects.", "🤢"),
+    ("Very Unhealthy", "#8f3e97", "Health warnings of emergency conditions.", "😵"),
+    ("Hazardous", "#7f0000", "Health alert: everyone should avoid all outdoor exertion.", "☠️"),
+    ("Unknown", "#808080", "Data not available.", "❓"),
+)
+UNKNOWN_CODE = len(AQI_CATEGORIES) - 1
+CATEGORY_LABELS = [category[0] for category in AQI_CATEGORIES]
+
+
+def categorize_aqi_codes(values):
+    """Returns the index into AQI_CATEGORIES for every value of an AQI array (NaN maps to Unknown)."""
+    values = np.asarray(values, dtype='float64')
+    nan = np.isnan(values)
+    codes = np.searchsorted(AQI_BREAKPOINTS, np.trunc(np.where(nan, 0, values)), side='left')
+    codes[nan] = UNKNOWN_CODE
+    return codes
+
+
+def categorize_aqi(aqi):
+    """Returns (category, color, advice, emoji) for a single AQI value."""
+    if aqi is None or np.isnan(aqi): return AQI_CATEGORIES[UNKNOWN_CODE]
+    return AQI_CATEGORIES[int(np.searchsorted(AQI_BREAKPOINTS, int(aqi), side='left'))]
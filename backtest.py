@@ -0,0 +1,203 @@
+"""Backtests the LSTM forecaster (and optionally the AQI regression model) over the processed history.
+
+Every N_PAST-hour window of the dataset is a forecast origin. Windows are
+strided views over the scaled data, scored in large batches, and scored
+against the AQI that followed, per forecast hour and per AQI category of
+the actual value. Windows with missing inputs are skipped; missing targets
+are left out of the error sums.
+
+    python backtest.py                                    # full history, summary table
+    python backtest.py --output predictions.csv --metrics metrics.json
+    python backtest.py --data other_city.csv --start 2024-01-01 --regression
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from aqi import CATEGORY_LABELS, categorize_aqi_codes
+
+SUMMARY_HOURS = (1, 3, 6, 12, 24, 48, 72)
+
+
+class ErrorAccumulator:
+    """Running absolute and squared error sums per forecast hour and per AQI category of the actual value."""
+
+    def __init__(self, horizon):
+        self.horizon = horizon
+        n_categories = len(CATEGORY_LABELS)
+        self.hour_abs, self.hour_sq, self.hour_n = np.zeros(horizon), np.zeros(horizon), np.zeros(horizon, dtype='int64')
+        self.cat_abs, self.cat_sq, self.cat_n = np.zeros(n_categories), np.zeros(n_categories), np.zeros(n_categories, dtype='int64')
+
+    def add(self, predicted, actual):
+        """Adds an (n, horizon) block of predictions and actual values; NaN actuals are ignored."""
+        valid = ~np.isnan(actual)
+        error = np.where(valid, predicted - actual, 0.0)
+        self.hour_abs += np.abs(error).sum(axis=0); self.hour_sq += (error ** 2).sum(axis=0); self.hour_n += valid.sum(axis=0)
+        codes = categorize_aqi_codes(actual[valid])
+        n_categories = len(CATEGORY_LABELS)
+        self.cat_abs += np.bincount(codes, weights=np.abs(error[valid]), minlength=n_categories)
+        self.cat_sq += np.bincount(codes, weights=error[valid] ** 2, minlength=n_categories)
+        self.cat_n += np.bincount(codes, minlength=n_categories)
+
+    @staticmethod
+    def _rows(abs_sum, sq_sum, n):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return n, abs_sum / n, np.sqrt(sq_sum / n)
+
+    def metrics(self):
+        n, mae, rmse = self._rows(self.hour_abs, self.hour_sq, self.hour_n)
+        by_hour = [{"hour": h + 1, "n": int(n[h]), "mae": float(mae[h]), "rmse": float(rmse[h])} for h in range(self.horizon)]
+        n, mae, rmse = self._rows(self.cat_abs, self.cat_sq, self.cat_n)
+        by_category = [{"category": label, "n": int(n[i]), "mae": float(mae[i]), "rmse": float(rmse[i])} for i, label in enumerate(CATEGORY_LABELS) if n[i]]
+        total_n = self.hour_n.sum()
+        overall = {"n": int(total_n), "mae": float(self.hour_abs.sum() / total_n) if total_n else None, "rmse": float(np.sqrt(self.hour_sq.sum() / total_n)) if total_n else None}
+        return {"overall": overall, "by_hour": by_hour, "by_category": by_category}
+
+
+def aqi_inverse(scaler, n_features):
+    """Slope and intercept that map the scaled AQI column (column 0) back to AQI.
+
+    The app's scalers are per-feature affine maps, so two inverse transforms
+    pin down the map once instead of inverse-transforming a padded matrix
+    for every prediction.
+    """
+    probe = np.zeros((2, n_features)); probe[1, 0] = 1.0
+    low, high = scaler.inverse_transform(probe)[:, 0]
+    return high - low, low
+
+
+def backtest_lstm(frame, scaler, feature_names, forward, n_past, horizon=None, batch_size=1024, step=1, writer=None):
+    """Scores every ``step``-th forecast origin of ``frame`` in batches of ``batch_size`` windows.
+
+    ``forward`` maps an (n, n_past, n_features) float32 array to scaled
+    AQI predictions of shape (n, model horizon). Only one block of rows is
+    scaled at a time, so memory stays bounded for long histories.
+    ``writer(origins, predicted, actual)`` receives each scored block.
+    Returns (ErrorAccumulator, number of windows scored, number skipped).
+    """
+    aqi = frame['AQI'].to_numpy(dtype='float64')
+    slope, intercept = aqi_inverse(scaler, len(feature_names))
+    features = frame[feature_names]
+    n_rows = len(frame)
+    accumulator, scored, skipped = None, 0, 0
+    block = batch_size * step
+    for start in range(0, max(0, n_rows - n_past), block):
+        stop = min(start + block, n_rows - n_past)  # origins whose first target hour exists
+        scaled = scaler.transform(features.iloc[start:stop + n_past - 1]).astype('float32')
+        windows = sliding_window_view(scaled, n_past, axis=0).transpose(0, 2, 1)[::step]
+        missing = np.concatenate([[0], np.cumsum(np.isnan(scaled).any(axis=1))])
+        complete = (missing[n_past::step][:len(windows)] - missing[:-n_past:step][:len(windows)]) == 0
+        skipped += int((~complete).sum())
+        if not complete.any(): continue
+        predicted = np.asarray(forward(np.ascontiguousarray(windows[complete]))).reshape(int(complete.sum()), -1)
+        if accumulator is None:
+            horizon = min(horizon or predicted.shape[1], predicted.shape[1])
+            accumulator = ErrorAccumulator(horizon)
+            # Targets past the end of the history stay NaN and are left out of the errors.
+            targets = sliding_window_view(np.concatenate([aqi, np.full(horizon, np.nan)]), horizon)
+        predicted = np.clip(predicted[:, :horizon] * slope + intercept, 0, None)
+        first_target = start + n_past + np.flatnonzero(complete) * step
+        actual = targets[first_target]
+        accumulator.add(predicted, actual)
+        scored += len(predicted)
+        if writer: writer(frame.index[first_target - 1], predicted, actual)
+    return accumulator, scored, skipped
+
+
+def backtest_regression(frame, model, feature_names, batch_size=65536):
+    """Scores the AQI regression model on every complete row of ``frame`` in chunks."""
+    accumulator = ErrorAccumulator(1)
+    for start in range(0, len(frame), batch_size):
+        chunk = frame.iloc[start:start + batch_size]
+        chunk = chunk[chunk[feature_names].notna().all(axis=1)]
+        if chunk.empty: continue
+        predicted = np.clip(model.predict(chunk[feature_names]), 0, None)
+        accumulator.add(predicted.reshape(-1, 1), chunk['AQI'].to_numpy(dtype='float64').reshape(-1, 1))
+    return accumulator
+
+
+def csv_writer(path):
+    """Returns a writer that appends long-format rows (origin, hour, predicted, actual) to ``path``."""
+    state = {"header": True}
+    if os.path.exists(path): os.remove(path)
+    def write(origins, predicted, actual):
+        n, horizon = predicted.shape
+        block = pd.DataFrame({
+            'origin': np.repeat(origins.strftime('%Y-%m-%dT%H:%M:%S').to_numpy(), horizon),
+            'hour': np.tile(np.arange(1, horizon + 1), n),
+            'predicted_aqi': predicted.ravel().round(3),
+            'actual_aqi': actual.ravel(),
+        })
+        block.to_csv(path, mode='a', header=state["header"], index=False)
+        state["header"] = False
+    return write
+
+
+def print_metrics(title, metrics, hours=None):
+    print(f"\n{title}")
+    if hours != ():
+        print(f"{'hour':>6}{'n':>10}{'MAE':>10}{'RMSE':>10}")
+        for row in metrics['by_hour']:
+            if hours is None or row['hour'] in hours: print(f"{row['hour']:>6}{row['n']:>10}{row['mae']:>10.2f}{row['rmse']:>10.2f}")
+        print()
+    print(f"{'category':<32}{'n':>10}{'MAE':>10}{'RMSE':>10}")
+    for row in metrics['by_category']: print(f"{row['category']:<32}{row['n']:>10}{row['mae']:>10.2f}{row['rmse']:>10.2f}")
+    overall = metrics['overall']
+    if overall['n']: print(f"{'overall':<32}{overall['n']:>10}{overall['mae']:>10.2f}{overall['rmse']:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the AQI forecasting models over the processed history.")
+    parser.add_argument('--data', help="processed hourly CSV (default: the Kathmandu history)")
+    parser.add_argument('--start', help="first forecast origin (date or timestamp, UTC)")
+    parser.add_argument('--end', help="last forecast origin (date or timestamp, UTC)")
+    parser.add_argument('--horizon', type=int, help="forecast hours to evaluate (default: the model's full horizon)")
+    parser.add_argument('--step', type=int, default=1, help="evaluate every n-th forecast origin")
+    parser.add_argument('--batch-size', type=int, default=1024, help="windows per model call")
+    parser.add_argument('--output', help="stream per-window predictions to this CSV")
+    parser.add_argument('--metrics', help="write the metrics as JSON to this file")
+    parser.add_argument('--regression', action='store_true', help="also evaluate the AQI regression model")
+    parser.add_argument('--all-hours', action='store_true', help="print every forecast hour instead of a summary")
+    args = parser.parse_args()
+
+    import app
+    from static_snapshot import load_static_frame
+    started = time.perf_counter()
+    frame = load_static_frame(args.data, os.path.join(app.CACHE_DIR, 'backtest')) if args.data else app.location_data[app.DEFAULT_LOCATION].static_frame()
+    if frame.empty: sys.exit("No historical data to backtest.")
+    if args.start or args.end:
+        # Keep the N_PAST hours before the first origin as its input window.
+        lo = frame.index.searchsorted(pd.Timestamp(args.start, tz='UTC')) - app.N_PAST + 1 if args.start else 0
+        hi = frame.index.searchsorted(pd.Timestamp(args.end, tz='UTC'), side='right') + (args.horizon or app.N_PAST) if args.end else len(frame)
+        frame = frame.iloc[max(0, lo):hi]
+    scaler, feature_names = app.models.require('scaler'), app.scaler_feature_names()
+    forward = app.models.require('lstm_forward')
+    load_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    writer = csv_writer(args.output) if args.output else None
+    accumulator, scored, skipped = backtest_lstm(frame, scaler, feature_names, forward, app.N_PAST, args.horizon, args.batch_size, args.step, writer)
+    lstm_seconds = time.perf_counter() - started
+    if accumulator is None: sys.exit("No complete input windows in the selected range.")
+    results = {"data": args.data or "processed_data.csv", "rows": len(frame), "n_past": app.N_PAST, "horizon": accumulator.horizon,
+               "windows": scored, "skipped_windows": skipped, "seconds": round(lstm_seconds, 3), "lstm": accumulator.metrics()}
+    print(f"\nLSTM backtest: {scored} windows ({skipped} skipped for missing inputs) over {len(frame)} hours in {lstm_seconds:.2f}s (models and data loaded in {load_seconds:.2f}s).")
+    print_metrics(f"LSTM error by forecast hour (AQI units, horizon {accumulator.horizon})", results['lstm'], None if args.all_hours else SUMMARY_HOURS)
+
+    if args.regression:
+        started = time.perf_counter()
+        results['regression'] = backtest_regression(frame, app.models.require('regression'), app.regression_feature_names()).metrics()
+        print_metrics(f"Regression model error ({time.perf_counter() - started:.2f}s)", results['regression'], ())
+    if args.output: print(f"\nPredictions written to {args.output}")
+    if args.metrics:
+        with open(args.metrics, 'w') as f: json.dump(results, f, indent=2)
+        print(f"Metrics written to {args.metrics}")
+
+
+if __name__ == '__main__':
+    main()
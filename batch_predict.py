@@ -0,0 +1,125 @@
+import os
+import io
+import json
+import numpy as np
+import pandas as pd
+from aqi import AQI_CATEGORIES, categorize_aqi_codes
+
+MAX_BATCH_ROWS = int(os.environ.get('PREDICT_BATCH_MAX_ROWS', 100000))
+MAX_BATCH_BYTES = int(os.environ.get('PREDICT_BATCH_MAX_BYTES', 64 * 2**20))
+DEFAULT_CHUNK_SIZE = 5000
+CSV_TYPES = ('text/csv', 'application/csv')
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/x-jsonlines')
+CATEGORY_NAMES = np.array([c[0] for c in AQI_CATEGORIES], dtype=object)
+CATEGORY_COLORS = np.array([c[1] for c in AQI_CATEGORIES], dtype=object)
+
+
+class BatchValidationError(ValueError):
+    """Raised when a batch prediction request cannot be parsed or fails validation."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _too_large():
+    return BatchValidationError(f"Request body too large (limit {MAX_BATCH_BYTES} bytes).", status=413)
+
+
+def _read_limited(stream):
+    """Reads a stream of at most MAX_BATCH_BYTES, failing as soon as it grows past that."""
+    chunks, size = [], 0
+    while True:
+        chunk = stream.read(min(2**20, MAX_BATCH_BYTES + 1 - size))
+        if not chunk: return b''.join(chunks)
+        chunks.append(chunk); size += len(chunk)
+        if size > MAX_BATCH_BYTES: raise _too_large()
+
+
+def _read_body(request):
+    """Returns (format, text) for an uploaded file or a raw request body of at most MAX_BATCH_BYTES.
+
+    A declared Content-Length over the limit is rejected before anything is
+    read; a chunked body is read only until it passes the limit.
+    """
+    if request.content_length is not None and request.content_length > MAX_BATCH_BYTES: raise _too_large()
+    upload = next(iter(request.files.values()), None)
+    if upload is not None:
+        name, mimetype = (upload.filename or '').lower(), (upload.mimetype or '').lower()
+        text = _read_limited(upload.stream).decode('utf-8-sig')
+        if name.endswith('.csv') or mimetype in CSV_TYPES: return 'csv', text
+        if name.endswith(('.ndjson', '.jsonl')) or mimetype in NDJSON_TYPES: return 'ndjson', text
+        return 'json', text
+    mimetype = (request.mimetype or '').lower()
+    text = _read_limited(request.stream).decode('utf-8', 'replace')
+    if mimetype in CSV_TYPES: return 'csv', text
+    if mimetype in NDJSON_TYPES: return 'ndjson', text
+    return 'json', text
+
+
+def _frame_from_json(payload, feature_names):
+    if isinstance(payload, dict) and 'columns' in payload and 'data' in payload:
+        return pd.DataFrame(payload['data'], columns=payload['columns'])
+    rows = payload.get('rows') if isinstance(payload, dict) else payload
+    if not isinstance(rows, list): raise BatchValidationError("Expected a JSON array of rows, {\"rows\": [...]} or {\"columns\": [...], \"data\": [[...]]}.")
+    if rows and all(isinstance(row, list) for row in rows):
+        if any(len(row) != len(feature_names) for row in rows): raise BatchValidationError(f"Array rows must have {len(feature_names)} values in the order of 'features'.")
+        return pd.DataFrame(rows, columns=feature_names)
+    if not all(isinstance(row, dict) for row in rows): raise BatchValidationError("Rows must all be objects or all be arrays.")
+    return pd.DataFrame.from_records(rows)
+
+
+def parse_batch(request, feature_names):
+    """Parses a JSON, CSV or NDJSON batch into a float64 frame with ``feature_names`` as columns.
+
+    Returns ``(features, ids)`` where ``ids`` holds the optional ``id``
+    column of the input (or None), with None for rows without an id.
+    Raises BatchValidationError listing missing columns or the rows with
+    missing or non-numeric values.
+    """
+    fmt, text = _read_body(request)
+    if not text.strip(): raise BatchValidationError("The request contains no rows.")
+    try:
+        if fmt == 'csv': df = pd.read_csv(io.StringIO(text))
+        elif fmt == 'ndjson': df = pd.DataFrame.from_records([json.loads(line) for line in text.splitlines() if line.strip()])
+        else: df = _frame_from_json(json.loads(text), feature_names)
+    except BatchValidationError:
+        raise
+    except ValueError as e:
+        raise BatchValidationError(f"Could not parse {fmt.upper()} body: {e}")
+    if df.empty: raise BatchValidationError("The request contains no rows.")
+    if len(df) > MAX_BATCH_ROWS: raise BatchValidationError(f"Too many rows: {len(df)} (limit {MAX_BATCH_ROWS}).", status=413)
+    missing = [name for name in feature_names if name not in df.columns]
+    if missing: raise BatchValidationError(f"Missing feature columns: {', '.join(missing)}.")
+    features = df[list(feature_names)].apply(pd.to_numeric, errors='coerce').astype('float64')
+    bad_rows = np.flatnonzero(features.isna().any(axis=1).to_numpy())
+    if len(bad_rows):
+        shown = ', '.join(str(i) for i in bad_rows[:10]) + (', ...' if len(bad_rows) > 10 else '')
+        raise BatchValidationError(f"{len(bad_rows)} rows have missing or non-numeric feature values (rows {shown}).")
+    # Blank CSV cells and rows without an id read as NaN (not valid JSON) and turn integer ids into floats.
+    ids = df['id'].convert_dtypes().astype(object).where(df['id'].notna(), None).tolist() if 'id' in df.columns else None
+    return features, ids
+
+
+def score_batch(model, features):
+    """Predicts AQI for every row in one vectorized call and labels it. Returns (aqi, category codes)."""
+    aqi = np.clip(model.predict(features), 0, None)
+    return aqi, categorize_aqi_codes(aqi)
+
+
+def batch_results(aqi, codes, ids=None, offset=0):
+    """Builds the per-row result records for scored rows starting at row ``offset``."""
+    records = [{'row': row, 'predicted_aqi': value, 'category': category, 'color': color}
+               for row, value, category, color in zip(range(offset, offset + len(aqi)), np.round(aqi, 2).tolist(), CATEGORY_NAMES[codes].tolist(), CATEGORY_COLORS[codes].tolist())]
+    if ids is not None:
+        for record, key in zip(records, ids): record['id'] = key
+    return records
+
+
+def iter_ndjson_results(model, features, ids=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Scores ``features`` chunk by chunk and yields NDJSON lines, so large outputs can be streamed."""
+    for start in range(0, len(features), chunk_size):
+        chunk = features.iloc[start:start + chunk_size]
+        aqi, codes = score_batch(model, chunk)
+        chunk_ids = ids[start:start + chunk_size] if ids is not None else None
+        yield ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in batch_results(aqi, codes, chunk_ids, offset=start))
@@ -0,0 +1,249 @@
+"""Offline benchmark suite for the app's hot paths, with JSON baselines.
+
+Everything runs locally: live data comes from the Open-Meteo stub, the
+history of a synthetic "bench" city is generated at the requested length,
+the user database is SQLite and all caches live in a temporary CACHE_DIR.
+The models in models/ must be present. Reports p50/p95/p99 latency,
+throughput and traced memory peak per scenario, time per stage of a cold
+live-data build, and a concurrent load run.
+
+    python benchmarks/bench_app.py --save benchmarks/baseline.json
+    python benchmarks/bench_app.py --compare benchmarks/baseline.json --fail-on-regression
+    python benchmarks/bench_app.py --history-days 1095 --gap-hours 720 --concurrency 16
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import threading
+import subprocess
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from common import ROOT, BENCH_LOCATION, offline_environment, write_synthetic_history, summarize, time_calls, peak_memory
+
+COMPARED_METRICS = (('p50_ms', 1), ('p95_ms', 1), ('throughput_rps', -1))  # -1: lower is worse
+
+
+class StageTimer:
+    """Accumulates wall time per named stage of wrapped callables (nested stages overlap)."""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    def wrap(self, name, fn):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try: return fn(*args, **kwargs)
+            finally: self.seconds[name] += time.perf_counter() - started; self.calls[name] += 1
+        return timed
+
+    def report(self, runs):
+        return {name: {"mean_ms": self.seconds[name] / runs * 1000, "calls_per_run": self.calls[name] / runs} for name in self.seconds}
+
+
+def cold_live_dataframe(app, location, runs):
+    """Builds the live frame of a fresh copy of ``location`` ``runs`` times and times each stage of the build."""
+    timer, samples = StageTimer(), []
+    compute = app.compute_ambient_forecasts
+    app.compute_ambient_forecasts = timer.wrap('forecast', compute)
+    try:
+        for i in range(runs):
+            key = f"{location.key}-cold-{os.getpid()}-{i}"
+            app.locations[key] = location._replace(key=key)
+            data = app.location_data[key] = app.LocationData(app.locations[key])
+            data.static_frame = timer.wrap('static_load', data.static_frame)
+            data.bridge.seed = timer.wrap('seed', data.bridge.seed)
+            data.bridge.fetch = timer.wrap('open_meteo_fetch', data.bridge.fetch)
+            data.bridge.score = timer.wrap('score', data.bridge.score)
+            data.store.append = timer.wrap('store_append', data.store.append)
+            data.store.overwrite = timer.wrap('store_overwrite', data.store.overwrite)
+            started = time.perf_counter()
+            app.get_cached_or_create_live_dataframe(key)
+            samples.append(time.perf_counter() - started)
+            del app.location_data[key], app.locations[key]
+    finally:
+        app.compute_ambient_forecasts = compute
+    return summarize(samples), timer.report(runs)
+
+
+def logged_in_client(app, username):
+    client = app.app.test_client()
+    client.post('/api/register', json={'username': username, 'password': 'bench'})
+    response = client.post('/api/login', json={'username': username, 'password': 'bench'})
+    if response.status_code != 200: sys.exit(f"Could not log in the benchmark user: {response.get_json()}")
+    client.post('/api/profile', json={'age': 67, 'conditions': 'Asthma, mild heart disease'})
+    return client
+
+
+def request_mix(app, location, feature_row):
+    """(name, call(client)) pairs for the HTTP scenarios; each call returns the response."""
+    now = datetime.now(timezone.utc)
+    def eda(days):
+        query = f"&start={(now - timedelta(days=days)).strftime('%Y-%m-%d')}" if days else ''
+        return lambda c: c.get(f'/api/eda_data?location={location}{query}')
+    return [
+        ("forecast_lstm", lambda c: c.post('/api/forecast_lstm', json={'hours': 24, 'location': location})),
+        ("eda_data 7d", eda(7)),
+        ("eda_data 30d", eda(30)),
+        ("eda_data 365d", eda(365)),
+        ("eda_data full", eda(None)),
+        ("historical_data", lambda c: c.get(f'/api/historical_data?location={location}')),
+        ("fetch_current_data", lambda c: c.get(f'/api/fetch_current_data?location={location}')),
+        ("predict", lambda c: c.post('/api/predict', json=feature_row)),
+    ]
+
+
+def check(response, name):
+    if response.status_code >= 400: raise RuntimeError(f"{name} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+
+def run_load(app, mix, clients, duration):
+    """Sends the request mix from one thread per client for ``duration`` seconds; returns overall and per-request stats."""
+    samples, errors, lock = defaultdict(list), defaultdict(int), threading.Lock()
+    deadline = time.perf_counter() + duration
+    def worker(client, seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            name, call = rng.choice(mix)
+            started = time.perf_counter()
+            status = call(client).status_code
+            elapsed = time.perf_counter() - started
+            with lock:
+                samples[name].append(elapsed)
+                if status >= 500: errors[name] += 1
+    threads = [threading.Thread(target=worker, args=(client, i)) for i, client in enumerate(clients)]
+    started = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - started
+    overall = summarize([s for values in samples.values() for s in values], elapsed)
+    overall.update(concurrency=len(clients), duration_s=elapsed, errors=sum(errors.values()))
+    return {"overall": overall, "by_request": {name: dict(summarize(values, elapsed), errors=errors[name]) for name, values in sorted(samples.items())}}
+
+
+def git_commit():
+    try: return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception: return None
+
+
+def compare(results, baseline, threshold):
+    """Prints the change of every shared metric against ``baseline``; returns the regressions beyond ``threshold``."""
+    regressions = []
+    current = dict(results['scenarios'], **{f"load {k}": v for k, v in results['load']['by_request'].items()}, **{"load overall": results['load']['overall']})
+    previous = dict(baseline['scenarios'], **{f"load {k}": v for k, v in baseline['load']['by_request'].items()}, **{"load overall": baseline['load']['overall']})
+    print(f"\nComparison with baseline {baseline['meta'].get('commit')} ({baseline['meta'].get('created_at')}), threshold {threshold:.0%}")
+    print(f"{'scenario':<32}{'metric':<16}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name in current:
+        if name not in previous: continue
+        for metric, direction in COMPARED_METRICS:
+            old, new = previous[name].get(metric), current[name].get(metric)
+            if not old or new is None: continue
+            change = (new - old) / old
+            worse = change * direction > threshold
+            if worse: regressions.append((name, metric, change))
+            print(f"{name:<32}{metric:<16}{old:>12.2f}{new:>12.2f}{change:>+10.1%}{'  REGRESSION' if worse else ''}")
+    return regressions
+
+
+def print_table(title, rows):
+    print(f"\n{title}")
+    print(f"{'scenario':<32}{'n':>6}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'peak MB':>10}")
+    for name, r in rows.items():
+        if not r.get('n'): continue
+        rps = f"{r['throughput_rps']:>10.1f}" if 'throughput_rps' in r else f"{'-':>10}"
+        peak = f"{r['peak_mb']:>10.1f}" if 'peak_mb' in r else f"{'-':>10}"
+        print(f"{name:<32}{r['n']:>6}{r['mean_ms']:>10.2f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{rps}{peak}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the app's hot paths offline.")
+    parser.add_argument('--requests', type=int, default=100, help="sequential calls per scenario")
+    parser.add_argument('--history-days', type=int, default=1140, help="days of synthetic history for the bench city")
+    parser.add_argument('--gap-hours', type=int, default=240, help="hours between the end of the history and now, fetched from the stub")
+    parser.add_argument('--location', default=BENCH_LOCATION, help="city to benchmark; 'kathmandu' uses the real processed data")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds the stub sleeps before every response")
+    parser.add_argument('--cold-runs', type=int, default=3, help="cold live-store builds to time")
+    parser.add_argument('--concurrency', type=int, default=8, help="client threads in the load run (0 skips it)")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds of the load run")
+    parser.add_argument('--save', help="write the results as a JSON baseline to this file")
+    parser.add_argument('--compare', help="compare against a JSON baseline written by --save")
+    parser.add_argument('--threshold', type=float, default=0.2, help="relative change counted as a regression")
+    parser.add_argument('--fail-on-regression', action='store_true', help="exit with status 1 when --compare finds a regression")
+    args = parser.parse_args()
+
+    server, workdir = offline_environment(latency=args.latency, location=args.location)
+    started = time.perf_counter()
+    import app
+    import database
+    import_seconds = time.perf_counter() - started
+    location = app.resolve_location(app.locations, args.location)
+    if location.key == BENCH_LOCATION:
+        rows = write_synthetic_history(os.path.join(workdir, 'history.csv'), args.history_days, args.gap_hours, app.API_TO_MODEL_MAP)
+        print(f"Synthetic history: {rows} hours ending {args.gap_hours} hours ago.")
+    database.init_db()
+
+    started = time.perf_counter()
+    app.models.preload(['regression', 'personal_risk', 'soil_imputer', 'scaler', 'lstm_forward'], background=False)
+    startup = {"import_s": import_seconds, "model_load_s": time.perf_counter() - started, "models": app.models.status()}
+    if app.models.get('lstm') is None or app.models.get('regression') is None: sys.exit("The models in models/ must be loaded to run this benchmark.")
+
+    cold, stages = cold_live_dataframe(app, location, args.cold_runs)
+    rng = np.random.default_rng(0)
+    feature_row = {name: float(v) for name, v in zip(app.regression_feature_names(), rng.uniform(1, 50, len(app.regression_feature_names())))}
+    anonymous, logged_in = app.app.test_client(), logged_in_client(app, 'bench-0')
+    mix = request_mix(app, location.key, feature_row)
+    for name, call in mix: check(call(anonymous), name)  # warm every cache once
+
+    now = datetime.now(timezone.utc)
+    direct = {
+        "live_dataframe warm": lambda: app.get_cached_or_create_live_dataframe(location.key),
+        "create_live_dataframe": lambda: app.create_live_dataframe(now, location.key),
+    }
+    scenarios = {"live_dataframe cold": cold}
+    for name, fn in direct.items():
+        scenarios[name] = time_calls(fn, args.requests)
+        scenarios[name]['peak_mb'] = peak_memory(fn)
+    for name, call in mix:
+        for label, client in (("", anonymous), (" logged-in", logged_in)):
+            if label and name not in ("forecast_lstm", "predict"): continue
+            scenarios[name + label] = time_calls(lambda: call(client), args.requests)
+            scenarios[name + label]['peak_mb'] = peak_memory(lambda: call(client))
+
+    load = {"overall": {}, "by_request": {}}
+    if args.concurrency > 0:
+        clients = [logged_in_client(app, f'bench-{i + 1}') if i % 2 else app.app.test_client() for i in range(args.concurrency)]
+        load = run_load(app, mix, clients, args.duration)
+    server.shutdown()
+
+    process = app.memory_usage()
+    results = {
+        "meta": {"commit": git_commit(), "created_at": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'), "python": platform.python_version(),
+                 "platform": platform.platform(), "numpy": np.__version__, "pandas": app.pd.__version__, "args": vars(args)},
+        "startup": startup, "process": process, "stages": stages, "scenarios": scenarios, "load": load,
+    }
+    print(f"\nStartup: import {import_seconds:.2f}s, model load {startup['model_load_s']:.2f}s; process RSS {process['rss_mb']} MB (peak {process['peak_rss_mb']} MB)")
+    print(f"\nCold live-data build, time per stage over {args.cold_runs} runs (stages nest: seed includes static_load, fetch and score overlap the build)")
+    for name, stage in sorted(stages.items(), key=lambda item: -item[1]['mean_ms']): print(f"  {name:<20}{stage['mean_ms']:>10.1f} ms{stage['calls_per_run']:>8.1f} calls/run")
+    print_table("Sequential scenarios", scenarios)
+    if load['overall']:
+        print_table(f"Concurrent load: {load['overall']['concurrency']} clients for {load['overall']['duration_s']:.1f}s, {load['overall']['errors']} errors",
+                    dict(load['by_request'], overall=load['overall']))
+
+    if args.save:
+        with open(args.save, 'w') as f: json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.save}")
+    if args.compare:
+        with open(args.compare) as f: baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}.")
+        if regressions and args.fail_on_regression: sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
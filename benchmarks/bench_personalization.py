@@ -0,0 +1,59 @@
+"""Per-request latency of /api/forecast_lstm for anonymous and logged-in users.
+
+Runs offline: live data comes from the local Open-Meteo stub, the live store
+lives in a temporary CACHE_DIR, and the logged-in user is served by the
+login manager instead of MySQL. The models in models/ must be present.
+
+    python benchmarks/bench_personalization.py --requests 200 --users 1000
+"""
+import sys
+import argparse
+import numpy as np
+from common import offline_environment, time_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark forecast personalization.")
+    parser.add_argument('--requests', type=int, default=200, help="requests per endpoint scenario")
+    parser.add_argument('--hours', type=int, default=72, help="forecast hours requested")
+    parser.add_argument('--users', type=int, default=1000, help="profiles scored together in the batch scenario")
+    args = parser.parse_args()
+
+    server, _ = offline_environment(location='kathmandu')
+    import app
+    from personalization import score_horizon, score_users, user_features
+    risk_model = app.models.get('personal_risk')
+    if risk_model is None or app.models.get('lstm') is None: sys.exit("The personal risk and LSTM models must be loaded to run this benchmark.")
+
+    user = app.User(1, 'bench', '', age=67, conditions='Asthma, mild heart disease')
+    app.login_manager.user_loader(lambda user_id: user if str(user_id) == '1' else None)
+    anonymous, logged_in = app.app.test_client(), app.app.test_client()
+    with logged_in.session_transaction() as session: session['_user_id'] = '1'; session['_fresh'] = True
+    body = {'hours': args.hours}
+    for client in (anonymous, logged_in):
+        response = client.post('/api/forecast_lstm', json=body)
+        if response.status_code != 200: sys.exit(f"Warm-up request failed: {response.get_json()}")
+
+    ambient = app.get_ambient_forecast()['values'][:args.hours]
+    features = user_features(user)
+    rng = np.random.default_rng(0)
+    many = np.column_stack([rng.integers(10, 90, args.users), rng.integers(0, 2, args.users), rng.integers(0, 2, args.users)])
+    loop_n = max(1, args.requests // 10)
+    results = {
+        "request anonymous": time_calls(lambda: anonymous.post('/api/forecast_lstm', json=body), args.requests),
+        "request logged-in": time_calls(lambda: logged_in.post('/api/forecast_lstm', json=body), args.requests),
+        "per-hour predict loop": time_calls(lambda: [max(v, risk_model.predict(app.prepare_personal_model_input(v, user))[0]) for v in ambient], loop_n),
+        "score_horizon": time_calls(lambda: score_horizon(risk_model, ambient, features), args.requests),
+        f"score_users x{args.users}": time_calls(lambda: score_users(risk_model, ambient, many), loop_n),
+    }
+    server.shutdown()
+
+    print(f"\n{'scenario':<28}{'n':>6}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, r in results.items():
+        print(f"{name:<28}{r['n']:>6}{r['mean_ms']:>10.2f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}")
+    overhead = results["request logged-in"]["p50_ms"] - results["request anonymous"]["p50_ms"]
+    print(f"\nLogged-in overhead at p50: {overhead:.2f} ms for {len(ambient)} forecast hours.")
+
+
+if __name__ == '__main__':
+    main()
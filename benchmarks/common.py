@@ -0,0 +1,89 @@
+"""Shared helpers for the offline benchmarks: environment setup, timing and memory measurement."""
+import os
+import sys
+import json
+import time
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from open_meteo_stub import start_stub_server, synthetic_hourly
+
+BENCH_LOCATION = 'bench'
+
+
+def offline_environment(latency=0.0, missing_hours=0, location=BENCH_LOCATION):
+    """Points the app at a local Open-Meteo stub, a temporary CACHE_DIR and a SQLite database.
+
+    Must run before ``import app``. A ``location`` other than an existing
+    one is added through LOCATIONS_FILE with its history at
+    ``<workdir>/history.csv`` (see ``write_synthetic_history``). Returns
+    ``(server, workdir)``.
+    """
+    server, base_url = start_stub_server(latency=latency, missing_hours=missing_hours)
+    workdir = tempfile.mkdtemp(prefix='aqi-bench-')
+    os.environ['OPEN_METEO_ARCHIVE_URL'] = f"{base_url}/v1/archive"
+    os.environ['OPEN_METEO_AIR_QUALITY_URL'] = f"{base_url}/v1/air-quality"
+    os.environ['CACHE_DIR'] = os.path.join(workdir, 'cache')
+    os.environ['LIVE_REFRESH_INTERVAL'] = '0'
+    os.environ['DB_BACKEND'] = 'sqlite'
+    os.environ['DB_PATH'] = os.path.join(workdir, 'bench.db')
+    if location == BENCH_LOCATION:
+        with open(os.path.join(workdir, 'locations.json'), 'w') as f:
+            json.dump([{"key": location, "name": "Benchmark City", "latitude": 27.7172, "longitude": 85.3240, "static_data": "history.csv"}], f)
+        os.environ['LOCATIONS_FILE'] = os.path.join(workdir, 'locations.json')
+    return server, workdir
+
+
+def write_synthetic_history(path, history_days, gap_hours, column_map):
+    """Writes a processed-style hourly CSV of ``history_days`` days ending ``gap_hours`` before now.
+
+    Readings come from the stub's generator (renamed with ``column_map``);
+    soil readings and AQI are simple functions of them. The gap is what a
+    cold live store has to fetch and score before it is current.
+    """
+    end = pd.Timestamp.now(tz='UTC').floor('h') - pd.Timedelta(hours=gap_hours)
+    start = end - pd.Timedelta(days=history_days)
+    hourly = synthetic_hourly(start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'), list(column_map))['hourly']
+    df = pd.DataFrame({column_map[k]: v for k, v in hourly.items() if k != 'time'}, index=pd.DatetimeIndex(pd.to_datetime(hourly['time']), name='Datetime'))
+    df = df[(df.index >= start.tz_localize(None)) & (df.index <= end.tz_localize(None))]
+    df['AQI'] = np.clip(df['PM2.5 (μg/m³)'] * 2.2 + df['PM10 (μg/m³)'] * 0.3, 0, 500).round()
+    df['Soil_Moisture (m³/m³)'] = (0.35 + df['Humidity (%)'] / 1000).round(3)
+    df['Soil_Temp (°C)'] = (df['Temp (°C)'] - 1.5).round(1)
+    df.to_csv(path)
+    return len(df)
+
+
+def summarize(samples, elapsed=None):
+    """Latency percentiles (ms) of ``samples`` (seconds), with throughput when ``elapsed`` is given."""
+    ms = np.asarray(samples) * 1000
+    if not len(ms): return {"n": 0}
+    stats = {"n": len(ms), "mean_ms": float(ms.mean()), "p50_ms": float(np.percentile(ms, 50)),
+             "p95_ms": float(np.percentile(ms, 95)), "p99_ms": float(np.percentile(ms, 99)), "max_ms": float(ms.max())}
+    if elapsed: stats["throughput_rps"] = float(len(ms) / elapsed)
+    return stats
+
+
+def time_calls(fn, n):
+    samples = []
+    started = time.perf_counter()
+    for _ in range(n):
+        t = time.perf_counter(); fn(); samples.append(time.perf_counter() - t)
+    return summarize(samples, time.perf_counter() - started)
+
+
+def peak_memory(fn, n=3):
+    """Peak traced Python and NumPy allocation in MB over ``n`` calls of ``fn``.
+
+    Measured in a separate pass because tracing slows the calls down.
+    """
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        for _ in range(n): fn()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
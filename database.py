@@ -2,22 +2,74 @@
 import mysql.connector
 from mysql.connector import errorcode
 import os
+import time
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
 
+DB_BACKEND = os.environ.get('DB_BACKEND', 'mysql').lower()  # 'mysql', or 'sqlite' as a local stand-in
 DB_HOST = os.environ.get('DB_HOST', 'localhost')
 DB_USER = os.environ.get('DB_USER', 'root')
 DB_PASSWORD = os.environ.get('DB_PASSWORD', '')
 DB_NAME = 'aqi_app'
+DB_PATH = os.environ.get('DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'aqi_app.db'))
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+DB_POOL_PING_AFTER = float(os.environ.get('DB_POOL_PING_AFTER', 30))
+
+class PoolTimeoutError(RuntimeError):
+    """Raised when no pooled connection frees up within the checkout timeout."""
+
+def _sqlite_sql(sql):
+    """Translates the MySQL dialect used by the app and schema.sql to SQLite."""
+    return sql.replace('%s', '?').replace('INT PRIMARY KEY AUTO_INCREMENT', 'INTEGER PRIMARY KEY AUTOINCREMENT')
+
+class _SqliteCursor:
+    """Gives a sqlite3 cursor the parts of the mysql.connector cursor API the app uses."""
+    def __init__(self, conn, dictionary=False):
+        self._cursor, self._dictionary = conn.cursor(), dictionary
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(_sqlite_sql(sql), params)
+
+    def _row(self, row):
+        if row is None or not self._dictionary: return row
+        return dict(zip([d[0] for d in self._cursor.description], row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    @property
+    def lastrowid(self): return self._cursor.lastrowid
+
+    @property
+    def rowcount(self): return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+def _connect():
+    if DB_BACKEND == 'sqlite':
+        # Pooled connections move between request threads, one thread at a time.
+        return sqlite3.connect(DB_PATH, check_same_thread=False, timeout=DB_POOL_TIMEOUT)
+    return mysql.connector.connect(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME)
+
+def make_cursor(conn, dictionary=False):
+    """Opens a cursor with %s placeholders (and dict rows if ``dictionary``) on either backend."""
+    if isinstance(conn, sqlite3.Connection): return _SqliteCursor(conn, dictionary)
+    return conn.cursor(dictionary=dictionary)
 
 def get_db_connection():
-    """Establishes a connection to the MySQL database."""
+    """Establishes a new, unpooled connection to the database. Request handlers should use db_cursor()."""
     try:
-        conn = mysql.connector.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME
-        )
-        return conn
+        return _connect()
+    except sqlite3.Error as err:
+        print(f"Could not open SQLite database '{DB_PATH}': {err}")
+        return None
     except mysql.connector.Error as err:
         if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
             print("Something is wrong with your user name or password")
@@ -27,24 +79,148 @@ def get_db_connection():
             print(err)
         return None
 
+class ConnectionPool:
+    """Bounded pool of database connections shared by the request threads of one process.
+
+    At most ``size`` connections are checked out at once; further checkouts
+    wait up to ``timeout`` seconds and then raise PoolTimeoutError. Idle
+    connections are reused most-recent first. One that sat idle for longer
+    than ``ping_after`` seconds, or whose last use raised an error, is
+    pinged before reuse and replaced if the server dropped it. Every
+    connection is rolled back on return, so no transaction (or MySQL read
+    snapshot) leaks into the next checkout. A forked worker starts with an
+    empty pool rather than sharing its parent's sockets.
+    """
+
+    def __init__(self, connect, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, ping_after=DB_POOL_PING_AFTER):
+        self._connect, self.size, self.timeout, self.ping_after = connect, size, timeout, ping_after
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self.in_use = 0
+        self.opened = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid(): self._reset()
+
+    @staticmethod
+    def _ping(conn):
+        try:
+            cursor = make_cursor(conn); cursor.execute("SELECT 1"); cursor.fetchall(); cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        self.discarded += 1
+        try: conn.close()
+        except Exception: pass
+
+    def acquire(self):
+        """Checks a healthy connection out of the pool, opening one if none is idle."""
+        self._check_pid()
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeoutError(f"No database connection became free within {self.timeout}s (pool size {self.size}).")
+        try:
+            while True:
+                try:
+                    conn, idle_since, suspect = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = self._connect(); self.opened += 1
+                    break
+                if (not suspect and time.monotonic() - idle_since < self.ping_after) or self._ping(conn):
+                    self.reused += 1
+                    break
+                self._discard(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock: self.in_use += 1
+        return conn
+
+    def release(self, conn, failed=False):
+        """Returns a connection to the pool. ``failed`` marks it for a health check before its next use."""
+        if self._pid != os.getpid(): return
+        try:
+            conn.rollback()
+            self._idle.put((conn, time.monotonic(), failed))
+        except Exception:
+            self._discard(conn)
+        finally:
+            with self._lock: self.in_use -= 1
+            self._slots.release()
+
+    def close(self):
+        """Closes every idle connection."""
+        while True:
+            try: conn, _, _ = self._idle.get_nowait()
+            except queue.Empty: break
+            self._discard(conn)
+
+    def status(self):
+        return {"backend": DB_BACKEND, "size": self.size, "in_use": self.in_use, "idle": self._idle.qsize(),
+                "opened": self.opened, "reused": self.reused, "discarded": self.discarded}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Returns the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None: _pool = ConnectionPool(_connect)
+    return _pool
+
+@contextmanager
+def db_cursor(dictionary=False, commit=False):
+    """Yields a cursor on a pooled connection for one unit of work.
+
+    Commits when the block succeeds and ``commit`` is set, and always
+    returns the connection to the pool; an error rolls the work back.
+    """
+    pool = get_pool()
+    conn = pool.acquire()
+    failed = False
+    try:
+        cursor = make_cursor(conn, dictionary)
+        try:
+            yield cursor
+            if commit: conn.commit()
+        finally:
+            cursor.close()
+    except Exception:
+        failed = True
+        raise
+    finally:
+        pool.release(conn, failed)
+
 def init_db():
     """Initializes the database by creating tables from the schema.sql file."""
     conn = get_db_connection()
     if conn is None:
         print("Could not connect to the database. Aborting initialization.")
         return
-        
-    cursor = conn.cursor()
-    
-    with open('schema.sql') as f:
+
+    cursor = make_cursor(conn)
+
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema.sql')) as f:
         sql_commands = f.read().split(';')
         for command in sql_commands:
             if command.strip():
                 try:
                     cursor.execute(command)
-                except mysql.connector.Error as err:
+                except (mysql.connector.Error, sqlite3.Error) as err:
                     print(f"Failed executing command: {command.strip()}")
-                    print(f"MySQL Error: {err}")
+                    print(f"Database Error: {err}")
 
     conn.commit()
     cursor.close()
@@ -52,4 +228,4 @@ def init_db():
     print("Database initialized successfully.")
 
 if __name__ == '__main__':
-    init_db()
\ No newline at end of file
+    init_db()
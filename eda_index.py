@@ -0,0 +1,174 @@
+import threading
+import numpy as np
+import pandas as pd
+from aqi import CATEGORY_LABELS, categorize_aqi_codes
+
+HOUR_NS = 3_600 * 10**9
+DAY_NS = 24 * HOUR_NS
+DIST_BINS = 20
+TABLE_COLUMNS = ['AQI', 'Temp (°C)', 'Humidity (%)', 'Wind_Speed (km/h)']
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def _rollup(ts, aqi, first_day, n_days):
+    """Per-day partial aggregates of hourly AQI for days ``first_day .. first_day + n_days - 1``.
+
+    ``ts`` are UTC int64 nanoseconds. Returns sums, counts, min and max per
+    day, sums and counts per day and hour of day, and category counts per
+    day.
+    """
+    n_categories = len(CATEGORY_LABELS)
+    day = (ts // DAY_NS - first_day).astype('int64')
+    codes = categorize_aqi_codes(aqi)
+    valid = ~np.isnan(aqi)
+    day_v, values = day[valid], aqi[valid]
+    hour_slot = day_v * 24 + (ts[valid] // HOUR_NS) % 24
+    parts = {
+        'sum': np.bincount(day_v, weights=values, minlength=n_days),
+        'count': np.bincount(day_v, minlength=n_days),
+        'min': np.full(n_days, np.inf),
+        'max': np.full(n_days, -np.inf),
+        'hour_sum': np.bincount(hour_slot, weights=values, minlength=n_days * 24).reshape(n_days, 24),
+        'hour_count': np.bincount(hour_slot, minlength=n_days * 24).reshape(n_days, 24),
+        'categories': np.bincount(day * n_categories + codes, minlength=n_days * n_categories).reshape(n_days, n_categories),
+    }
+    np.minimum.at(parts['min'], day_v, values)
+    np.maximum.at(parts['max'], day_v, values)
+    return parts
+
+
+class EdaIndex:
+    """Precomputed per-day AQI rollups that answer /api/eda_data for any date range.
+
+    Built once from the hourly frame and kept in step with the live store.
+    A query combines the stored partials of the days fully inside the range
+    with partials rolled up on the fly from the hourly rows of the (at most
+    two) partial days at its ends, so the cost depends on the number of days
+    in the range rather than on the number of hourly rows. Only the
+    distribution and the median, which cannot be combined from partials
+    exactly, are computed from the hourly AQI values of the range.
+    """
+
+    def __init__(self, df=None):
+        self._lock = threading.Lock()
+        self._generation = None
+        self.rebuild(df if df is not None else pd.DataFrame(columns=TABLE_COLUMNS, index=pd.DatetimeIndex([], tz='UTC', name='Datetime'), dtype='float64'))
+
+    def __len__(self):
+        return len(self._table)
+
+    @property
+    def last_timestamp(self):
+        return self._table.index[-1] if len(self._table) else None
+
+    def rebuild(self, df):
+        """Replaces the index with rollups of every row of ``df``."""
+        table = df.reindex(columns=TABLE_COLUMNS).astype('float64').sort_index()
+        table = table[~table.index.duplicated(keep='last')]
+        with self._lock:
+            self._set_table(table)
+            self._first_day = int(self._ts[0] // DAY_NS) if len(table) else 0
+            n_days = int(self._ts[-1] // DAY_NS) - self._first_day + 1 if len(table) else 0
+            self._days = _rollup(self._ts, self._aqi, self._first_day, n_days)
+
+    def _set_table(self, table):
+        self._table = table
+        self._ts = table.index.as_unit('ns').asi8
+        self._aqi = table['AQI'].to_numpy()
+
+    def update(self, df):
+        """Merges new or revised hourly rows and re-rolls only the days they touch."""
+        if df.empty: return
+        rows = df.reindex(columns=TABLE_COLUMNS).astype('float64').sort_index()
+        with self._lock:
+            rows = pd.concat([self._table, rows]) if len(self._table) else rows
+            if not (rows.index.is_monotonic_increasing and rows.index.is_unique):
+                rows = rows[~rows.index.duplicated(keep='last')].sort_index()
+            touched = df.index.as_unit('ns').asi8
+            self._set_table(rows)
+            if not len(self._days['count']): self._first_day = int(self._ts[0] // DAY_NS)
+            d0, d1 = int(touched.min() // DAY_NS), int(touched.max() // DAY_NS)
+            grow = d1 - self._first_day + 1 - len(self._days['count'])
+            if grow > 0:
+                empty = _rollup(self._ts[:0], self._aqi[:0], 0, grow)
+                self._days = {k: np.concatenate([v, empty[k]]) for k, v in self._days.items()}
+            lo, hi = np.searchsorted(self._ts, [d0 * DAY_NS, (d1 + 1) * DAY_NS])
+            parts = _rollup(self._ts[lo:hi], self._aqi[lo:hi], d0, d1 - d0 + 1)
+            for k, v in parts.items(): self._days[k][d0 - self._first_day:d1 - self._first_day + 1] = v
+
+    def sync(self, store):
+        """Pulls rows appended to a LiveStore since the last sync, or rebuilds after the store rewrote rows."""
+        generation = store.generation
+        if self._generation is not None and generation != self._generation:
+            self.rebuild(store.frame())
+        else:
+            last = self.last_timestamp
+            self.update(store.slice(start=last + pd.Timedelta(hours=1)) if last is not None else store.frame())
+        self._generation = generation
+
+    def _span(self, lo, hi):
+        """Combines partials for hourly rows ``lo:hi`` into per-day arrays plus range totals."""
+        ts, aqi = self._ts[lo:hi], self._aqi[lo:hi]
+        d0, d1 = int(ts[0] // DAY_NS), int(ts[-1] // DAY_NS)
+        head_end, tail_start = np.searchsorted(ts, [(d0 + 1) * DAY_NS, d1 * DAY_NS])
+        pieces = [_rollup(ts[:head_end], aqi[:head_end], d0, 1)]
+        if d1 > d0:
+            middle = slice(d0 + 1 - self._first_day, d1 - self._first_day)
+            pieces.append({k: v[middle] for k, v in self._days.items()})
+            pieces.append(_rollup(ts[tail_start:], aqi[tail_start:], d1, 1))
+        daily = {k: np.concatenate([p[k] for p in pieces]) for k in ('sum', 'count', 'min', 'max')}
+        totals = {k: sum(p[k].sum(axis=0, dtype='float64') for p in pieces) for k in ('hour_sum', 'hour_count', 'categories')}
+        return d0, d1, daily, totals
+
+    def summary(self, start=None, end=None):
+        """Returns the /api/eda_data payload for ``[start, end]`` (default: the year up to the last row), or None if empty."""
+        with self._lock:
+            if not len(self._table): return None
+            end = pd.Timestamp(end) if end is not None else self._table.index[-1]
+            start = pd.Timestamp(start) if start is not None else end - pd.DateOffset(years=1)
+            lo, hi = self._table.index.searchsorted(start, side='left'), self._table.index.searchsorted(end, side='right')
+            if lo >= hi: return None
+            d0, d1, daily, totals = self._span(lo, hi)
+            df_table = self._table.iloc[max(lo, hi - 500):hi].round(1)
+            aqi = self._aqi[lo:hi]
+        aqi = aqi[~np.isnan(aqi)]
+        days = pd.DatetimeIndex((np.arange(d0, d1 + 1) * DAY_NS).astype('datetime64[ns]'), tz='UTC')
+        has_data = daily['count'] > 0
+        daily_avg = np.round(daily['sum'][has_data] / daily['count'][has_data], 2)
+        count = daily['count'].sum()
+        if count:
+            aqi_min, aqi_max = float(daily['min'].min()), float(daily['max'].max())
+            stats = {"mean": round(float(daily['sum'].sum() / count), 2), "median": round(float(np.median(aqi)), 2), "max": round(aqi_max, 2), "min": round(aqi_min, 2)}
+            hist, bins = np.histogram(aqi, bins=DIST_BINS)
+        else:
+            stats = {"mean": None, "median": None, "max": None, "min": None}
+            hist, bins = np.zeros(DIST_BINS, dtype='int64'), np.linspace(0, 1, DIST_BINS + 1)
+        category_counts = totals['categories'].astype('int64')
+        order = [i for i in np.argsort(-category_counts, kind='stable') if category_counts[i]]
+        months, weekdays = days.month.to_numpy() - 1, days.weekday.to_numpy()
+        month_sum = np.bincount(months, weights=daily['sum'], minlength=12); month_count = np.bincount(months, weights=daily['count'], minlength=12)
+        weekday_sum = np.bincount(weekdays, weights=daily['sum'], minlength=7); weekday_count = np.bincount(weekdays, weights=daily['count'], minlength=7)
+        hour_sum, hour_count = totals['hour_sum'], totals['hour_count']
+        df_table.index.name = 'Datetime'
+        df_table = df_table.reset_index()
+        return {
+            "table_data": {"columns": df_table.columns.tolist(), "data": df_table.to_dict(orient='records')},
+            "time_series": {
+                "aqi_over_time": {"labels": days.strftime('%Y-%m-%d').tolist(), "values": daily_avg.tolist()},
+                "dist": {"labels": [f"{int(b)}-{int(bins[i+1])}" for i, b in enumerate(bins[:-1])], "values": hist.tolist()},
+                "categories": {"labels": [CATEGORY_LABELS[i] for i in order], "values": [int(category_counts[i]) for i in order]},
+                "stats": stats
+            },
+            "deep_dive": {
+                "by_month": _grouped_means(MONTH_NAMES, month_sum, month_count),
+                "by_day_of_week": _grouped_means(DAY_NAMES, weekday_sum, weekday_count),
+                "by_hour": _grouped_means([f"{h:02d}:00" for h in range(24)], hour_sum, hour_count)
+            }
+        }
+
+
+def _grouped_means(labels, sums, counts):
+    keep = np.flatnonzero(counts)
+    return {"labels": [labels[i] for i in keep], "values": np.round(sums[keep] / counts[keep], 2).tolist()}
+
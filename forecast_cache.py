@@ -0,0 +1,72 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def model_version(*paths):
+    """Short fingerprint of model artifacts from their names, sizes and modification times."""
+    parts = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            parts.append(f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns}")
+        except OSError:
+            parts.append(f"{os.path.basename(path)}:missing")
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:12]
+
+
+class ForecastCache:
+    """Keeps the ambient forecasts computed for the most recent input windows.
+
+    Entries are keyed on the last timestamp of the input window, the live
+    store generation and the model version, so a forecast is computed once
+    per new hour of data (or per backfill rewrite or model swap) and shared
+    by every request until then. Concurrent
+    misses on the same key wait for a single computation.
+    """
+
+    def __init__(self, maxsize=4):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key); self.hits += 1
+                return self._entries[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    self.hits += 1
+                    return self._entries[key]
+            entry = compute()
+            with self._lock:
+                self._entries[key] = entry; self.misses += 1
+                while len(self._entries) > self.maxsize: self._entries.popitem(last=False)
+                self._key_locks.pop(key, None)
+            return entry
+
+    def get(self, key):
+        """Returns the cached entry for ``key`` or None, without computing it."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None: return None
+            self._entries.move_to_end(key); self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        """Stores an entry computed outside ``get_or_compute`` (e.g. in a batch) and returns it."""
+        with self._lock:
+            self._entries[key] = entry; self._entries.move_to_end(key); self.misses += 1
+            while len(self._entries) > self.maxsize: self._entries.popitem(last=False)
+        return entry
+
+    def status(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
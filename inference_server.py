@@ -0,0 +1,141 @@
+import os
+import time
+import queue
+import threading
+import numpy as np
+from concurrent.futures import Future
+
+
+class _Request:
+    __slots__ = ('inputs', 'future', 'enqueued_at')
+
+    def __init__(self, inputs):
+        self.inputs, self.future, self.enqueued_at = inputs, Future(), time.perf_counter()
+
+
+class MicroBatcher:
+    """Gathers concurrent model calls into one batched forward pass.
+
+    Callers submit arrays whose first axis is the batch axis (usually of
+    length 1). A worker thread waits up to ``max_wait`` seconds after the
+    first pending request for more to arrive, concatenates up to
+    ``max_batch_size`` rows, calls ``forward`` once and hands every caller
+    its own slice of the output. A request larger than ``max_batch_size`` is
+    run on its own, and if a batched call fails each request is retried
+    alone so only the bad one sees the error. The worker starts on first
+    use and again in each forked worker process.
+    """
+
+    def __init__(self, forward, max_batch_size=64, max_wait=0.005, name='model'):
+        self.forward = forward
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.name = name
+        self._lock = threading.Lock()
+        self._pid = None
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+        self.errors = 0
+        self.max_batch_rows = 0
+        self.batch_sizes = {}
+        self.total_wait = 0.0
+        self.total_forward = 0.0
+
+    def _ensure_worker(self):
+        if self._pid == os.getpid(): return
+        with self._lock:
+            if self._pid == os.getpid(): return
+            self._queue, self._carry = queue.Queue(), None
+            self._reset_metrics()
+            threading.Thread(target=self._run, name=f'{self.name}-batcher', daemon=True).start()
+            self._pid = os.getpid()
+
+    def submit(self, inputs):
+        """Queues ``inputs`` (batch axis first) and returns a Future for the matching output rows."""
+        self._ensure_worker()
+        request = _Request(np.asarray(inputs))
+        self._queue.put(request)
+        return request.future
+
+    def predict(self, inputs, timeout=None):
+        """Blocking form of ``submit``."""
+        return self.submit(inputs).result(timeout)
+
+    def _collect(self):
+        batch = [self._carry] if self._carry is not None else [self._queue.get()]
+        self._carry = None
+        rows = len(batch[0].inputs)
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if rows + len(request.inputs) > self.max_batch_size:
+                self._carry = request
+                break
+            batch.append(request); rows += len(request.inputs)
+        return batch, rows
+
+    def _run(self):
+        while True:
+            batch, rows = self._collect()
+            started = time.perf_counter()
+            try:
+                inputs = batch[0].inputs if len(batch) == 1 else np.concatenate([r.inputs for r in batch])
+                outputs = np.asarray(self.forward(inputs))
+            except Exception as e:
+                self.errors += 1
+                if len(batch) == 1: batch[0].future.set_exception(e)
+                else: self._run_each(batch)
+                continue
+            finished = time.perf_counter()
+            offset = 0
+            for request in batch:
+                n = len(request.inputs)
+                request.future.set_result(outputs[offset:offset + n]); offset += n
+            self.batches += 1; self.requests += len(batch); self.rows += rows
+            self.max_batch_rows = max(self.max_batch_rows, rows)
+            self.batch_sizes[rows] = self.batch_sizes.get(rows, 0) + 1
+            self.total_wait += sum(started - r.enqueued_at for r in batch)
+            self.total_forward += finished - started
+
+    def _run_each(self, batch):
+        # One malformed request must not fail the requests it happened to be batched with.
+        for request in batch:
+            try: request.future.set_result(np.asarray(self.forward(request.inputs)))
+            except Exception as e: request.future.set_exception(e)
+
+    def status(self):
+        """Queue depth and batching metrics as a JSON-serializable dict."""
+        running = self._pid == os.getpid()
+        return {
+            "queue_depth": self._queue.qsize() + (self._carry is not None) if running else 0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "requests": self.requests,
+            "errors": self.errors,
+            "mean_batch_rows": round(self.rows / self.batches, 2) if self.batches else None,
+            "max_batch_rows": self.max_batch_rows,
+            "batch_size_counts": {str(k): v for k, v in sorted(self.batch_sizes.items())},
+            "mean_queue_wait_ms": round(self.total_wait / self.requests * 1000, 3) if self.requests else None,
+            "mean_forward_ms": round(self.total_forward / self.batches * 1000, 3) if self.batches else None,
+        }
+
+
+def keras_forward(model):
+    """Wraps a Keras model in a traced ``tf.function`` to skip the per-call overhead of ``model.predict``.
+
+    The input signature leaves the batch axis open, so every batch size
+    reuses one graph.
+    """
+    import tensorflow as tf
+    signature = [tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32)]
+    call = tf.function(lambda x: model(x, training=False), input_signature=signature, reduce_retracing=True)
+    return lambda inputs: call(tf.convert_to_tensor(inputs, dtype=tf.float32)).numpy()
@@ -0,0 +1,70 @@
+import pandas as pd
+from datetime import timedelta
+
+BACKFILL_WINDOW = timedelta(days=30)
+
+
+class LiveBridge:
+    """Bridges the live store to the present by scoring only the hours it is missing.
+
+    ``fetch(start, end)`` returns the raw hourly upstream readings for the
+    inclusive UTC range, already renamed to the model's column names, with
+    NaN where the upstream had no value. ``score(df)`` adds the imputed and
+    predicted columns (soil readings and AQI) to a frame of raw readings.
+    ``seed()`` returns ``(rows, filled)``: the historical frame used to
+    initialise an empty store and the flags of its filled-in hours (or None
+    when every hour was observed), so ``backfill`` can later repair them.
+    """
+
+    def __init__(self, store, fetch, score, raw_columns, seed=None):
+        self.store = store
+        self.fetch = fetch
+        self.score = score
+        self.raw_columns = list(raw_columns)
+        self.seed = seed
+
+    def bridge(self, start, end, previous=None):
+        """Fetches and scores every hour in ``[start, end]``.
+
+        Returns ``(rows, filled)`` where ``filled`` flags hours with at least
+        one missing upstream reading. Missing readings are carried forward
+        from ``previous`` (the last known row) before falling back to the
+        next reading and finally to zero.
+        """
+        hours = pd.date_range(start, end, freq='h', tz='UTC', name='Datetime')
+        raw = self.fetch(start, end).reindex(index=hours, columns=self.raw_columns)
+        filled = raw.isna().any(axis=1)
+        if previous is not None and len(previous):
+            raw = pd.concat([previous[self.raw_columns].tail(1), raw]).ffill().iloc[1:]
+        raw = raw.ffill().bfill().fillna(0)
+        return self.score(raw), filled
+
+    def seed_if_empty(self):
+        """Initialises an empty store from the historical frame. Returns the number of rows written."""
+        if len(self.store) or self.seed is None: return 0
+        rows, filled = self.seed()
+        seeded = self.store.append(rows, filled=filled)
+        if seeded: print(f"Live store seeded with {seeded} historical rows.")  # 0 when a concurrent seed got there first
+        return seeded
+
+    def update(self, now):
+        """Appends the hours between the last stored hour and ``now``. Returns the number of rows added."""
+        self.seed_if_empty()
+        last = self.store.last_timestamp
+        if last is None: raise ValueError("Live store is empty and no seed data is available.")
+        start, end = last + timedelta(hours=1), pd.Timestamp(now).floor('h')
+        if start > end: return 0
+        rows, filled = self.bridge(start, end, previous=self.store.tail(1))
+        return self.store.append(rows, filled=filled)
+
+    def backfill(self, now, window=BACKFILL_WINDOW):
+        """Rescores filled-in hours from the last ``window`` whose readings are now available.
+
+        Returns the number of rows rewritten.
+        """
+        holes = self.store.filled_index(start=pd.Timestamp(now) - window)
+        if holes.empty: return 0
+        first = self.store.slice(end=holes[0] - timedelta(hours=1)).tail(1)
+        rows, filled = self.bridge(holes[0], holes[-1], previous=first)
+        recovered = rows.index.isin(holes) & ~filled.to_numpy()
+        return self.store.overwrite(rows[recovered])
@@ -0,0 +1,184 @@
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from live_store import FileLock
+
+MAX_RETRY_DELAY = 300
+
+
+class LiveRefresher:
+    """Refreshes one live store, at most once at a time, before it expires.
+
+    ``refresh()`` does the actual update of ``store``. Only one refresh runs
+    at a time across threads (an in-process lock) and across worker
+    processes (a lock file); a caller that loses the race returns at once and
+    readers keep being served the last good frame. A RefreshPool runs the
+    refresh ``interval`` seconds after the last one (see ``next_due``), so
+    with an interval shorter than ``max_age`` (the cache timeout) the store
+    is renewed before any request sees it expire.
+    """
+
+    def __init__(self, refresh, store, interval, max_age, lock_path):
+        self.refresh = refresh
+        self.store = store
+        self.interval = interval
+        self.max_age = max_age
+        self._thread_lock = threading.Lock()
+        self._file_lock = FileLock(lock_path)
+        self._failures = 0
+        self._retry_at = 0.0
+        self.refreshing = False
+        self.last_error = None
+        self.last_duration = None
+        self.last_attempt_at = None
+
+    def refresh_now(self, max_age=None):
+        """Runs one refresh unless another thread or process is already running one.
+
+        With ``max_age`` the refresh is skipped when the store was refreshed
+        more recently than that, which stops a worker from repeating a
+        refresh another worker finished while it waited. Returns True if this
+        call refreshed the store. Calls made while backing off after a
+        failed refresh return False without trying.
+        """
+        if time.time() < self._retry_at or not self._thread_lock.acquire(blocking=False): return False
+        try:
+            if not self._file_lock.acquire(blocking=False): return False
+            try:
+                if max_age is not None and self.store.is_fresh(max_age): return False
+                self.refreshing, self.last_attempt_at = True, time.time()
+                started = time.perf_counter()
+                try:
+                    self.refresh()
+                    self.last_error, self._failures = None, 0
+                    return True
+                except Exception as e:
+                    self.last_error, self._failures = str(e), self._failures + 1
+                    delay = min(MAX_RETRY_DELAY, 15 * 2 ** (self._failures - 1), self.interval)
+                    self._retry_at = time.time() + delay * random.uniform(0.8, 1.2)
+                    print(f"WARNING: Background live refresh failed: {e}")
+                    return False
+                finally:
+                    self.refreshing, self.last_duration = False, time.perf_counter() - started
+            finally:
+                self._file_lock.release()
+        finally:
+            self._thread_lock.release()
+
+    def next_due(self):
+        """Time (epoch seconds) of the next scheduled refresh: ``interval`` after the last one, or the end of a failure backoff."""
+        return self._retry_at if self._failures else (self.store.refreshed_at or 0) + self.interval
+
+    def status(self, background=False):
+        """Returns staleness metadata for the live store as a JSON-serializable dict.
+
+        ``background`` reports whether a scheduler (the RefreshPool) is
+        refreshing the store.
+        """
+        refreshed_at = self.store.refreshed_at
+        last_timestamp = self.store.last_timestamp
+        age = time.time() - refreshed_at if refreshed_at else None
+        return {
+            "refreshed_at": refreshed_at,
+            "age_seconds": round(age, 1) if age is not None else None,
+            "stale": age is None or age >= self.max_age,
+            "last_timestamp": last_timestamp.strftime('%Y-%m-%dT%H:%M:%S') if last_timestamp is not None else None,
+            "refreshing": self.refreshing,
+            "background": background,
+            "last_error": self.last_error,
+            "last_duration_seconds": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "pid": os.getpid(),
+        }
+
+
+class RefreshPool:
+    """Runs the refreshers of many live stores from one scheduler thread and a bounded worker pool.
+
+    ``refreshers`` maps a key (a location) to its LiveRefresher. Each store
+    keeps its own thread and file locks, so different stores refresh
+    concurrently (at most ``max_workers`` at a time) while a single store
+    is never refreshed twice at once. The scheduler sleeps until the next
+    store is due, or until ``trigger`` asks for one, and then also takes
+    the stores due within ``poll_interval`` so refreshes stay grouped in
+    rounds. ``on_round(keys)`` is called with the keys refreshed in a round
+    once all of its refreshes have finished.
+    """
+
+    def __init__(self, refreshers, max_workers=4, poll_interval=5.0, on_round=None):
+        self.refreshers = refreshers
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.on_round = on_round
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._requested = set()
+        self._pending = set()
+        self._not_before = {}
+        self._executor = None
+        self._thread = None
+
+    def start(self):
+        """Starts the scheduler once per process."""
+        if self._thread and self._thread.is_alive(): return
+        with self._lock:
+            if self._thread and self._thread.is_alive(): return
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='live-refresh')
+            self._pending.clear()
+            self._thread = threading.Thread(target=self._run, name='live-refresh-scheduler', daemon=True)
+            self._thread.start()
+
+    def trigger(self, key):
+        """Asks for the store under ``key`` to be refreshed soon without waiting for it."""
+        with self._lock: self._requested.add(key)
+        self._wake.set()
+
+    def _done(self, key, future, round_state):
+        refreshed = not future.exception() and future.result()
+        with self._lock:
+            self._pending.discard(key)
+            # A refresh skipped because another worker holds the store's lock is retried after a short pause, not in a tight loop.
+            if not refreshed: self._not_before[key] = time.time() + self.poll_interval
+            else: round_state["refreshed"].append(key)
+            round_state["left"] -= 1
+            finished = round_state["refreshed"] if round_state["left"] == 0 else None
+        self._wake.set()
+        if finished and self.on_round:
+            try: self.on_round(finished)
+            except Exception as e: print(f"WARNING: Refresh round callback failed: {e}")
+
+    def _due(self, now):
+        """Keys to refresh now and the delay until the next one is due. Marks the returned keys pending."""
+        with self._lock:
+            requested, self._requested = self._requested, set()
+            delays = {}
+            for key, refresher in list(self.refreshers.items()):
+                if key in self._pending: continue
+                delays[key] = max(refresher.next_due(), self._not_before.get(key, 0)) - now
+                if key in requested and self._not_before.get(key, 0) <= now: delays[key] = 0
+            due = [key for key, delay in delays.items() if delay <= 0]
+            if due: due = [key for key, delay in delays.items() if delay <= self.poll_interval]
+            self._pending.update(due)
+            later = [delay for key, delay in delays.items() if key not in due]
+        return due, min(later, default=self.poll_interval * 12)
+
+    def _run(self):
+        while True:
+            due, delay = self._due(time.time())
+            round_state = {"left": len(due), "refreshed": []}
+            for key in due:
+                # Stores joining the round up to poll_interval early must not be skipped as still fresh.
+                refresher = self.refreshers[key]
+                future = self._executor.submit(refresher.refresh_now, max_age=max(0, refresher.interval - self.poll_interval))
+                future.add_done_callback(lambda f, key=key, round_state=round_state: self._done(key, f, round_state))
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    @property
+    def running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def status(self):
+        with self._lock:
+            return {"max_workers": self.max_workers, "running": self.running, "refreshing": sorted(self._pending)}
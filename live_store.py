@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+INDEX_FILE = 'index.i8'
+VALUES_FILE = 'values.f8'
+FILLED_FILE = 'filled.u1'
+META_FILE = 'meta.json'
+LOCK_FILE = 'write.lock'
+
+
+class FileLock:
+    """Exclusive lock on a file, shared by every process on the host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self, blocking=True):
+        """Takes the lock. With ``blocking=False`` returns False at once if another process holds it."""
+        f = open(self.path, 'a+')
+        try:
+            if fcntl: fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            else: f.seek(0); msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is None: return
+        try:
+            if fcntl: fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else: self._file.seek(0); msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close(); self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class LiveStore:
+    """Append-only, memory-mapped columnar store for the live hourly dataframe.
+
+    Rows live in flat binary files: ``index.i8`` holds the UTC timestamps
+    as int64 nanoseconds and ``values.f8`` holds the row-major float64 values.
+    ``filled.u1`` holds one flag byte per row marking hours whose upstream
+    readings were missing and had to be filled in, so they can be rewritten
+    once the real readings arrive. ``meta.json`` records the column order and
+    when the store was last refreshed. New rows are appended to the end of the
+    files, so a refresh writes only the hours it adds, and readers map the
+    files instead of parsing them. Every process keeps one resident frame over
+    the mapping and remaps it only when another writer has grown the files.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._index_path = os.path.join(root, INDEX_FILE)
+        self._values_path = os.path.join(root, VALUES_FILE)
+        self._filled_path = os.path.join(root, FILLED_FILE)
+        self._meta_path = os.path.join(root, META_FILE)
+        self._lock = threading.RLock()
+        self._write_lock = FileLock(os.path.join(root, LOCK_FILE))
+        self._frame = None
+        self._index_size = -1
+        self._meta = {}
+        self._meta_mtime = None
+
+    # --- metadata -------------------------------------------------------
+
+    def _read_meta(self):
+        try:
+            mtime = os.stat(self._meta_path).st_mtime_ns
+        except FileNotFoundError:
+            self._meta, self._meta_mtime = {}, None
+            return self._meta
+        if mtime != self._meta_mtime:
+            try:
+                with open(self._meta_path, 'r') as f: self._meta = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"Live store metadata unreadable, treating store as empty. Error: {e}")
+                self._meta = {}
+            self._meta_mtime = mtime
+        return self._meta
+
+    def _write_meta(self, **changes):
+        meta = dict(self._read_meta()); meta.update(changes)
+        tmp_path = f"{self._meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f: json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path)
+        self._meta, self._meta_mtime = meta, os.stat(self._meta_path).st_mtime_ns
+
+    @property
+    def columns(self):
+        return list(self._read_meta().get('columns', []))
+
+    @property
+    def refreshed_at(self):
+        """Unix time of the last successful refresh, or None if never refreshed."""
+        return self._read_meta().get('refreshed_at')
+
+    def mark_refreshed(self, when=None):
+        with self._lock: self._write_meta(refreshed_at=time.time() if when is None else when)
+
+    @property
+    def generation(self):
+        """Counter bumped whenever stored rows are rewritten in place, so readers can drop derived state."""
+        return self._read_meta().get('generation', 0)
+
+    @property
+    def backfilled_at(self):
+        return self._read_meta().get('backfilled_at')
+
+    def mark_backfilled(self, when=None):
+        with self._lock: self._write_meta(backfilled_at=time.time() if when is None else when)
+
+    def is_fresh(self, max_age):
+        refreshed_at = self.refreshed_at
+        return refreshed_at is not None and len(self) > 0 and time.time() - refreshed_at < max_age
+
+    # --- reading --------------------------------------------------------
+
+    def _disk_rows(self, n_cols):
+        try:
+            index_rows = os.path.getsize(self._index_path) // 8
+            value_rows = os.path.getsize(self._values_path) // (8 * n_cols) if n_cols else 0
+        except FileNotFoundError:
+            return 0
+        return min(index_rows, value_rows)
+
+    def _sync(self):
+        """Remaps the resident frame if the files on disk have grown since the last read."""
+        try:
+            index_size = os.path.getsize(self._index_path)
+        except FileNotFoundError:
+            index_size = 0
+        if self._frame is not None and index_size == self._index_size: return
+        columns = self.columns
+        rows = self._disk_rows(len(columns))
+        if rows == 0:
+            self._frame = pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], tz='UTC', name='Datetime'), dtype='float64')
+        else:
+            index = np.memmap(self._index_path, dtype='int64', mode='r', shape=(rows,))
+            values = np.memmap(self._values_path, dtype='float64', mode='r', shape=(rows, len(columns)))
+            dt_index = pd.DatetimeIndex(pd.to_datetime(np.asarray(index), unit='ns', utc=True), name='Datetime')
+            self._frame = pd.DataFrame(values, index=dt_index, columns=columns, copy=False)
+        self._index_size = index_size
+
+    def frame(self):
+        """Returns the resident live frame (read-only, backed by the memory map)."""
+        with self._lock:
+            self._sync()
+            return self._frame
+
+    def __len__(self):
+        return len(self.frame())
+
+    @property
+    def last_timestamp(self):
+        df = self.frame()
+        return df.index[-1] if len(df) else None
+
+    def tail(self, n):
+        """Returns the last ``n`` rows without touching the rest of the history."""
+        return self.frame().iloc[-n:] if n > 0 else self.frame().iloc[:0]
+
+    def slice(self, start=None, end=None):
+        """Returns rows with ``start <= index <= end`` using a binary search over the index."""
+        df = self.frame()
+        lo = df.index.searchsorted(pd.Timestamp(start), side='left') if start is not None else 0
+        hi = df.index.searchsorted(pd.Timestamp(end), side='right') if end is not None else len(df)
+        return df.iloc[lo:hi]
+
+    def filled_index(self, start=None):
+        """Returns the timestamps of stored hours that were filled in rather than observed."""
+        df = self.frame()
+        if not len(df) or not os.path.exists(self._filled_path): return df.index[:0]
+        rows = min(len(df), os.path.getsize(self._filled_path))
+        flags = np.fromfile(self._filled_path, dtype='uint8', count=rows).astype(bool)
+        filled = df.index[:rows][flags]
+        return filled[filled >= pd.Timestamp(start)] if start is not None else filled
+
+    # --- writing --------------------------------------------------------
+
+    def _repair(self, n_cols):
+        """Truncates a partially written trailing row left behind by an interrupted append."""
+        rows = self._disk_rows(n_cols)
+        for path, row_bytes in ((self._index_path, 8), (self._values_path, 8 * n_cols), (self._filled_path, 1)):
+            if os.path.exists(path) and os.path.getsize(path) > rows * row_bytes:
+                with open(path, 'r+b') as f: f.truncate(rows * row_bytes)
+
+    def append(self, df, filled=None):
+        """Appends the rows of ``df`` that are newer than the last stored hour.
+
+        ``filled`` is an optional boolean Series over ``df.index`` flagging
+        rows that were filled in rather than observed. Returns the number of
+        rows written. The first append fixes the column order of the store;
+        later frames are reindexed to it.
+        """
+        with self._lock, self._write_lock:
+            self._sync()
+            columns = self.columns
+            if not columns:
+                columns = [str(c) for c in df.columns]
+                self._write_meta(columns=columns)
+            self._repair(len(columns))
+            self._sync()
+            new_rows = df.sort_index()
+            if len(self._frame): new_rows = new_rows[new_rows.index > self._frame.index[-1]]
+            new_rows = new_rows[~new_rows.index.duplicated(keep='last')]
+            if new_rows.empty: return 0
+            values = np.ascontiguousarray(new_rows.reindex(columns=columns).to_numpy(dtype='float64'))
+            index = np.ascontiguousarray(new_rows.index.tz_convert('UTC').as_unit('ns').asi8, dtype='int64')
+            flags = np.zeros(len(new_rows), dtype='uint8') if filled is None else filled.reindex(new_rows.index, fill_value=False).to_numpy(dtype='uint8')
+            # Values go first: a row only becomes visible once its timestamp is written.
+            with open(self._values_path, 'ab') as f: f.write(values.tobytes())
+            with open(self._filled_path, 'ab') as f: f.write(flags.tobytes())
+            with open(self._index_path, 'ab') as f: f.write(index.tobytes())
+            self._sync()
+            return len(new_rows)
+
+    def overwrite(self, df):
+        """Rewrites already stored hours in place with the rows of ``df`` and clears their filled flag.
+
+        Rows of ``df`` whose timestamp is not in the store are ignored.
+        Returns the number of rows rewritten. The resident frame and the
+        frames of other processes see the new values through the shared
+        mapping without a remap.
+        """
+        with self._lock, self._write_lock:
+            self._sync()
+            columns = self.columns
+            if not len(self._frame) or df.empty: return 0
+            self._repair(len(columns))
+            positions = self._frame.index.get_indexer(df.index)
+            found = positions >= 0
+            if not found.any(): return 0
+            positions = positions[found]
+            values = df[found].reindex(columns=columns).to_numpy(dtype='float64')
+            rows = len(self._frame)
+            stored = np.memmap(self._values_path, dtype='float64', mode='r+', shape=(rows, len(columns)))
+            stored[positions] = values; stored.flush(); del stored
+            flags = np.memmap(self._filled_path, dtype='uint8', mode='r+', shape=(rows,))
+            flags[positions] = 0; flags.flush(); del flags
+            self._write_meta(generation=self.generation + 1)
+            return int(found.sum())
@@ -0,0 +1,64 @@
+import os
+import re
+import json
+from typing import NamedTuple, Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_LOCATION = 'kathmandu'
+LOCATION_KEY = re.compile(r'^[a-z0-9][a-z0-9_-]*$')
+
+
+class UnknownLocationError(KeyError):
+    """Raised when a request names a location that is not configured."""
+
+
+class InvalidLocationError(ValueError):
+    """Raised when a request's location (or list of locations) is not a string (or a list of strings)."""
+
+
+class Location(NamedTuple):
+    """A city the app serves. ``static_data`` is an optional processed-history CSV used to seed its store."""
+    key: str
+    name: str
+    latitude: float
+    longitude: float
+    static_data: Optional[str] = None
+
+    def public(self):
+        return {"key": self.key, "name": self.name, "latitude": self.latitude, "longitude": self.longitude, "has_static_data": bool(self.static_data)}
+
+
+KATHMANDU = Location(DEFAULT_LOCATION, 'Kathmandu', 27.7172, 85.3240, os.path.join(BASE_DIR, 'data', 'processed', 'processed_data.csv'))
+
+
+def load_locations(path=None):
+    """Returns the configured locations by key: Kathmandu plus any listed in the JSON file at ``path``.
+
+    The file holds a list of objects with ``key``, ``name``, ``latitude``,
+    ``longitude`` and optionally ``static_data`` (a CSV path, relative to
+    the file). A location without static data is seeded from Open-Meteo.
+    """
+    locations = {KATHMANDU.key: KATHMANDU}
+    if not path: return locations
+    with open(path, 'r', encoding='utf-8') as f: entries = json.load(f)
+    for entry in entries:
+        key = str(entry['key']).lower()
+        if not LOCATION_KEY.match(key): raise ValueError(f"Invalid location key '{entry['key']}': use lowercase letters, digits, '-' and '_'.")
+        static_data = entry.get('static_data')
+        if static_data: static_data = os.path.join(os.path.dirname(os.path.abspath(path)), static_data)
+        locations[key] = Location(key, entry.get('name', key.title()), float(entry['latitude']), float(entry['longitude']), static_data)
+    return locations
+
+
+def resolve_location(locations, key=None):
+    """Returns the location for ``key`` (the default location when empty)."""
+    if key is not None and not isinstance(key, str): raise InvalidLocationError("'location' must be a string.")
+    key = (key or DEFAULT_LOCATION).strip().lower()
+    if key not in locations: raise UnknownLocationError(key)
+    return locations[key]
+
+
+def resolve_locations(locations, keys):
+    """Returns the locations for a list of keys."""
+    if not isinstance(keys, list) or not all(isinstance(key, str) for key in keys): raise InvalidLocationError("'locations' must be a list of strings.")
+    return [resolve_location(locations, key) for key in keys]
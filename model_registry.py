@@ -0,0 +1,115 @@
+import os
+import sys
+import time
+import threading
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class ModelUnavailableError(RuntimeError):
+    """Raised by ``ModelRegistry.require`` when an artifact failed to load."""
+
+
+class ModelRegistry:
+    """Loads model artifacts on first use and keeps them for the life of the process.
+
+    Each artifact is registered with a zero-argument loader. Nothing is
+    loaded at import, so a worker can answer page and session requests
+    before any model is read, and a worker that never forecasts never pays
+    for TensorFlow. Loads of different artifacts run independently;
+    concurrent first uses of one artifact wait for a single load. A failed
+    load is reported once and the artifact stays unavailable (None) until
+    ``reload`` is called, as when models were loaded at import.
+
+    Artifacts loaded before a fork are shared with the forked workers. A
+    load still running in another thread at the fork is abandoned in the
+    child: its lock is replaced there and the child loads the artifact
+    itself on first use.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._values = {}
+        self._errors = {}
+        self._load_seconds = {}
+        self._locks = {}
+        if hasattr(os, 'register_at_fork'): os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # The thread that held a lock at the fork does not exist in the child, so the lock would never be released.
+        self._locks = {name: threading.Lock() for name in self._loaders}
+
+    def register(self, name, loader, description=None, default=None):
+        """Registers ``loader`` under ``name``. ``default`` is returned by ``get`` while the artifact is unavailable."""
+        self._loaders[name] = (loader, description or name, default)
+        self._locks[name] = threading.Lock()
+
+    def _load(self, name):
+        with self._locks[name]:
+            if name in self._values or name in self._errors: return
+            loader, description, _ = self._loaders[name]
+            started = time.perf_counter()
+            try:
+                self._values[name] = loader()
+                self._load_seconds[name] = time.perf_counter() - started
+                print(f"{description} loaded in {self._load_seconds[name]:.2f}s.")
+            except Exception as e:
+                self._errors[name] = e
+                print(f"CRITICAL ERROR: Could not load {description}: {e}")
+
+    def get(self, name):
+        """Returns the artifact, loading it on first use, or its default if it could not be loaded."""
+        if name not in self._values and name not in self._errors: self._load(name)
+        return self._values.get(name, self._loaders[name][2])
+
+    def require(self, name):
+        """Like ``get`` but raises ModelUnavailableError instead of returning the default."""
+        value = self.get(name)
+        if name in self._errors: raise ModelUnavailableError(f"{self._loaders[name][1]} is not available: {self._errors[name]}")
+        return value
+
+    def is_loaded(self, name):
+        return name in self._values
+
+    def reload(self, name):
+        """Drops the artifact (or its load error) so the next use loads it again."""
+        with self._locks[name]:
+            self._values.pop(name, None); self._errors.pop(name, None); self._load_seconds.pop(name, None)
+
+    def preload(self, names=None, background=True):
+        """Loads ``names`` (default: everything) ahead of first use, in a daemon thread unless ``background`` is False.
+
+        Do not start a background preload in a process that forks workers
+        afterwards (e.g. gunicorn --preload): a worker forked mid-load gets
+        none of that load's work and loads the artifact again itself. Preload
+        with ``background=False`` before the fork, or in each worker after it.
+        """
+        names = list(self._loaders) if names is None else list(names)
+        def run():
+            for name in names: self.get(name)
+        if not background: return run()
+        thread = threading.Thread(target=run, name='model-preload', daemon=True)
+        thread.start()
+        return thread
+
+    def status(self):
+        return {name: {"loaded": name in self._values,
+                       "load_seconds": round(self._load_seconds[name], 3) if name in self._load_seconds else None,
+                       "error": str(self._errors[name]) if name in self._errors else None}
+                for name in self._loaders}
+
+
+def memory_usage():
+    """Current and peak resident set size of this process in MB (None where the platform does not report it)."""
+    rss = peak = None
+    try:
+        with open('/proc/self/statm') as f: rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == 'darwin' else 2**10)
+    return {"rss_mb": round(rss, 1) if rss is not None else None, "peak_rss_mb": round(peak, 1) if peak is not None else None}
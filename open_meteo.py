@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+import pandas as pd
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from requests.adapters import HTTPAdapter
+
+ARCHIVE_URL = os.environ.get('OPEN_METEO_ARCHIVE_URL', 'https://archive-api.open-meteo.com/v1/archive')
+AIR_QUALITY_URL = os.environ.get('OPEN_METEO_AIR_QUALITY_URL', 'https://air-quality-api.open-meteo.com/v1/air-quality')
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 30  # seconds; a server asking to wait longer (e.g. a spent daily quota) fails the request instead
+
+
+class OpenMeteoError(Exception):
+    """Raised when an Open-Meteo request fails after all retries, or the server asks to wait longer than allowed."""
+
+
+class OpenMeteoClient:
+    """Pooled, concurrent and retrying client for the Open-Meteo archive and air-quality APIs.
+
+    One keep-alive ``requests.Session`` is shared by a small thread pool.
+    ``fetch_hourly`` splits the date range into ``chunk_days`` chunks and
+    fetches every chunk of both endpoints in parallel, so a refresh costs
+    about one round trip instead of their sum. Each request is given
+    ``timeout`` (connect, read) seconds and retried with jittered exponential
+    backoff on connection errors, timeouts, 429 and 5xx responses. A
+    ``Retry-After`` of up to ``max_retry_after`` seconds is honoured; a
+    longer one raises OpenMeteoError at once rather than holding a worker
+    thread (and the caller's refresh locks) for it. Chunks that are
+    complete (every hour has a value) and end before today are cached on
+    disk under ``cache_dir``, keyed by the request URL and dates.
+    """
+
+    def __init__(self, archive_url=ARCHIVE_URL, air_quality_url=AIR_QUALITY_URL, timeout=(5, 30), retries=3,
+                 backoff=0.5, chunk_days=31, max_workers=4, cache_dir=None, session=None, max_retry_after=MAX_RETRY_AFTER):
+        self.archive_url = archive_url
+        self.air_quality_url = air_quality_url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_retry_after = max_retry_after
+        self.chunk_days = chunk_days
+        self.cache_dir = cache_dir
+        if cache_dir: os.makedirs(cache_dir, exist_ok=True)
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter); self.session.mount('http://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='open-meteo')
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "cache_hits": 0}
+
+    def _count(self, key):
+        with self._stats_lock: self.stats[key] += 1
+
+    # --- caching --------------------------------------------------------
+
+    def _cache_path(self, url, params):
+        key = json.dumps([url, sorted(params.items())])
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    @staticmethod
+    def _is_complete(payload):
+        return all(v is not None for values in payload.get('hourly', {}).values() for v in values)
+
+    # --- requests -------------------------------------------------------
+
+    def get_json(self, url, params):
+        """GETs one JSON document, served from the disk cache when possible."""
+        cacheable = self.cache_dir and date.fromisoformat(params['end_date']) < datetime.now(timezone.utc).date()
+        if cacheable:
+            path = self._cache_path(url, params)
+            try:
+                with open(path, 'r') as f: payload = json.load(f)
+                self._count('cache_hits')
+                return payload
+            except (FileNotFoundError, json.JSONDecodeError):
+                pass
+        payload = self._get_with_retries(url, params)
+        if cacheable and self._is_complete(payload):
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f: json.dump(payload, f)
+            os.replace(tmp_path, path)
+        return payload
+
+    def _get_with_retries(self, url, params):
+        for attempt in range(self.retries + 1):
+            self._count('requests')
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return response.json()
+                error = f"HTTP {response.status_code} from {url}"
+                retry_after = response.headers.get('Retry-After', '')
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error, retry_after = f"{type(e).__name__} for {url}: {e}", ''
+            if attempt == self.retries: break
+            self._count('retries')
+            delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+            if retry_after.isdigit():
+                if int(retry_after) > self.max_retry_after: raise OpenMeteoError(f"{error} asked to retry after {retry_after}s")
+                delay = max(delay, int(retry_after))
+            time.sleep(delay)
+        raise OpenMeteoError(f"{error} (gave up after {self.retries + 1} attempts)")
+
+    def _chunks(self, start, end):
+        day, last = pd.Timestamp(start).date(), pd.Timestamp(end).date()
+        while day <= last:
+            chunk_end = min(last, day + timedelta(days=self.chunk_days - 1))
+            yield day, chunk_end
+            day = chunk_end + timedelta(days=1)
+
+    def fetch_hourly(self, latitude, longitude, start, end, weather_params, air_quality_params):
+        """Returns the hourly weather and air-quality readings for the days spanning ``[start, end]``.
+
+        The frame is indexed by UTC ``Datetime`` with one column per
+        requested parameter (Open-Meteo names) and NaN where the API has no value.
+        """
+        requests_by_endpoint = {self.archive_url: ','.join(weather_params), self.air_quality_url: ','.join(air_quality_params)}
+        futures = {}
+        for url, hourly in requests_by_endpoint.items():
+            for chunk_start, chunk_end in self._chunks(start, end):
+                params = {"latitude": latitude, "longitude": longitude, "start_date": chunk_start.isoformat(),
+                          "end_date": chunk_end.isoformat(), "hourly": hourly, "timezone": "UTC"}
+                futures.setdefault(url, []).append(self._executor.submit(self.get_json, url, params))
+        frames = []
+        for url, endpoint_futures in futures.items():
+            chunks = [pd.DataFrame(future.result()['hourly']) for future in endpoint_futures]
+            frames.append(pd.concat(chunks, ignore_index=True).drop_duplicates('time', keep='last'))
+        df = frames[0].merge(frames[1], on='time', how='outer').rename(columns={'time': 'Datetime'})
+        df['Datetime'] = pd.to_datetime(df['Datetime'], utc=True)
+        return df.set_index('Datetime').sort_index().astype('float64')
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
@@ -0,0 +1,108 @@
+"""Local stand-in for the Open-Meteo archive and air-quality APIs.
+
+Serves deterministic synthetic hourly data for any date range so the live
+data pipeline can be exercised offline. Run it with
+
+    python open_meteo_stub.py --port 8099
+
+and point the app at it with
+OPEN_METEO_ARCHIVE_URL=http://127.0.0.1:8099/v1/archive and
+OPEN_METEO_AIR_QUALITY_URL=http://127.0.0.1:8099/v1/air-quality.
+"""
+import json
+import time
+import random
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# (mean, daily amplitude, noise) per parameter, roughly matching Kathmandu.
+PARAMETER_PROFILES = {
+    "temperature_2m": (18, 6, 1.5), "relative_humidity_2m": (70, 15, 5), "precipitation": (0.2, 0.2, 0.3),
+    "cloud_cover": (50, 20, 15), "surface_pressure": (870, 2, 0.5), "pressure_msl": (1012, 2, 0.5),
+    "wind_speed_10m": (6, 3, 1.5), "wind_direction_10m": (180, 90, 30), "wind_gusts_10m": (15, 6, 3),
+    "uv_index": (3, 3, 0.5), "pm10": (60, 20, 10), "pm2_5": (35, 12, 6), "carbon_monoxide": (600, 200, 80),
+    "nitrogen_dioxide": (20, 8, 4), "sulphur_dioxide": (6, 2, 1), "ozone": (60, 25, 8),
+}
+
+
+def synthetic_hourly(start_date, end_date, params, missing_hours=0):
+    """Builds an Open-Meteo style ``hourly`` payload for every hour of ``[start_date, end_date]``.
+
+    Values depend only on the parameter and the hour, so overlapping
+    requests agree. The last ``missing_hours`` hours are null, mimicking the
+    archive API's publication lag.
+    """
+    hours = pd.date_range(start_date, pd.Timestamp(end_date) + pd.Timedelta(hours=23), freq='h')
+    epoch_hours = hours.as_unit('ns').asi8 // 3_600_000_000_000
+    phase = 2 * np.pi * (hours.hour.to_numpy() - 6) / 24
+    payload = {"time": hours.strftime('%Y-%m-%dT%H:%M').tolist()}
+    for name in params:
+        mean, amplitude, noise = PARAMETER_PROFILES.get(name, (10, 5, 2))
+        seed = sum(map(ord, name))
+        jitter = np.sin(epoch_hours * 12.9898 + seed) * 43758.5453 % 1 - 0.5
+        values = np.maximum(0, mean + amplitude * np.sin(phase) + 2 * noise * jitter).round(2).tolist()
+        if missing_hours: values[-missing_hours:] = [None] * min(missing_hours, len(values))
+        payload[name] = values
+    return {"hourly": payload}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = 'OpenMeteoStub/1.0'
+
+    def do_GET(self):
+        options = self.server.options
+        url = urlparse(self.path)
+        if url.path not in ('/v1/archive', '/v1/air-quality'): return self._send(404, {"error": True, "reason": "Not found"})
+        if options['latency']: time.sleep(options['latency'])
+        if random.random() < options['fail_rate']: return self._send(503, {"error": True, "reason": "Injected failure"})
+        query = parse_qs(url.query)
+        try:
+            params = query['hourly'][0].split(',')
+            payload = synthetic_hourly(query['start_date'][0], query['end_date'][0], params, options['missing_hours'])
+        except (KeyError, ValueError) as e:
+            return self._send(400, {"error": True, "reason": f"Bad request: {e}"})
+        with self.server.lock: self.server.hits[url.path] = self.server.hits.get(url.path, 0) + 1
+        self._send(200, payload)
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.options['verbose']: super().log_message(format, *args)
+
+
+def start_stub_server(host='127.0.0.1', port=0, latency=0.0, fail_rate=0.0, missing_hours=0, verbose=False):
+    """Starts the stub in a daemon thread. Returns ``(server, base_url)``; stop it with ``server.shutdown()``."""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.options = {"latency": latency, "fail_rate": fail_rate, "missing_hours": missing_hours, "verbose": verbose}
+    server.hits, server.lock = {}, threading.Lock()
+    threading.Thread(target=server.serve_forever, name='open-meteo-stub', daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds to sleep before every response")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="fraction of requests answered with HTTP 503")
+    parser.add_argument('--missing-hours', type=int, default=0, help="trailing hours returned as null")
+    args = parser.parse_args()
+    server, base_url = start_stub_server(args.host, args.port, args.latency, args.fail_rate, args.missing_hours, verbose=True)
+    print(f"Open-Meteo stub listening on {base_url}")
+    print(f"  OPEN_METEO_ARCHIVE_URL={base_url}/v1/archive")
+    print(f"  OPEN_METEO_AIR_QUALITY_URL={base_url}/v1/air-quality")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
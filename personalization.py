@@ -0,0 +1,64 @@
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+PERSONAL_FEATURE_NAMES = ['ambient_aqi', 'age', 'has_respiratory_condition', 'has_heart_condition']
+RESPIRATORY_TERMS = ('asthma', 'copd', 'respiratory')
+HEART_TERMS = ('heart', 'cardiovascular')
+DEFAULT_AGE = 30
+
+
+@lru_cache(maxsize=4096)
+def profile_features(age, conditions):
+    """Parses a profile once into (age, has_respiratory_condition, has_heart_condition).
+
+    Cached on the profile values themselves, so every user with the same
+    profile shares one entry and an updated profile simply maps to a new one.
+    """
+    conditions = conditions.lower() if conditions else ""
+    has_respiratory = 1 if any(c in conditions for c in RESPIRATORY_TERMS) else 0
+    has_heart = 1 if any(c in conditions for c in HEART_TERMS) else 0
+    return (age if age else DEFAULT_AGE, has_respiratory, has_heart)
+
+
+def has_personal_profile(user):
+    return bool(user and user.is_authenticated and (user.age or user.conditions))
+
+
+def user_features(user):
+    """Returns the user's profile feature vector as a float array of length 3."""
+    return np.array(profile_features(user.age, user.conditions), dtype='float64')
+
+
+def _predict(model, X):
+    # The model was fitted on a DataFrame; wrapping the array (no copy) keeps the feature names it expects.
+    return model.predict(pd.DataFrame(X, columns=PERSONAL_FEATURE_NAMES, copy=False))
+
+
+def score_horizon(model, ambient, features):
+    """Perceived AQI for every ambient value of a forecast horizon, in one predict call.
+
+    Like the per-hour version, the perceived value never drops below the
+    ambient one.
+    """
+    ambient = np.asarray(ambient, dtype='float64')
+    X = np.empty((len(ambient), len(PERSONAL_FEATURE_NAMES)))
+    X[:, 0] = ambient
+    X[:, 1:] = features
+    return np.maximum(ambient, _predict(model, X))
+
+
+def score_users(model, ambient, features):
+    """Perceived AQI for many users over the same horizon, in one predict call.
+
+    ``features`` is an (n_users, 3) array of profile vectors. Returns an
+    (n_users, len(ambient)) array.
+    """
+    ambient = np.asarray(ambient, dtype='float64')
+    features = np.asarray(features, dtype='float64').reshape(-1, len(PERSONAL_FEATURE_NAMES) - 1)
+    n_users, n_hours = len(features), len(ambient)
+    X = np.empty((n_users, n_hours, len(PERSONAL_FEATURE_NAMES)))
+    X[:, :, 0] = ambient
+    X[:, :, 1:] = features[:, None, :]
+    perceived = _predict(model, X.reshape(n_users * n_hours, -1)).reshape(n_users, n_hours)
+    return np.maximum(ambient, perceived)
@@ -0,0 +1,31 @@
+import os
+import shutil
+import pandas as pd
+from live_store import LiveStore
+from forecast_cache import model_version
+
+
+def load_static_frame(csv_path, snapshot_root):
+    """Returns the processed history as a read-only frame over a memory-mapped binary snapshot.
+
+    The first process to need it parses the CSV once and writes a LiveStore
+    snapshot under ``snapshot_root/<fingerprint of the CSV>``; every later
+    start, and every forked worker, maps the same files instead of parsing
+    them, so the pages are shared through the OS page cache. Editing the CSV
+    changes the fingerprint and builds a fresh snapshot.
+    """
+    path = os.path.join(snapshot_root, model_version(csv_path))
+    if not os.path.exists(os.path.join(path, 'index.i8')):
+        df = pd.read_csv(csv_path, parse_dates=['Datetime'], index_col='Datetime').asfreq('h')
+        if df.index.tz is None: df.index = df.index.tz_localize('UTC')
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        LiveStore(tmp_path).append(df)
+        try:
+            os.rename(tmp_path, path)
+            print(f"Static data snapshot written to {path} ({len(df)} rows).")
+        except OSError:  # another worker published the same snapshot first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        for name in os.listdir(snapshot_root):
+            if name != os.path.basename(path) and not name.endswith('.tmp'): shutil.rmtree(os.path.join(snapshot_root, name), ignore_errors=True)
+    return LiveStore(path).frame()
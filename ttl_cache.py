@@ -0,0 +1,45 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries also expire ``ttl`` seconds after they were stored.
+
+    Invalidation is local to the process, so other workers can serve an
+    entry for up to ``ttl`` seconds after it changed.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None: del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key); self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize: self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock: self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock: self._entries.clear()
+
+    def status(self):
+        with self._lock:
+            return {"entries": len(self._entries), "maxsize": self.maxsize, "ttl_seconds": self.ttl, "hits": self.hits, "misses": self.misses}